@@ -0,0 +1,4 @@
+"""Offline benchmarks for the backend hot paths.
+
+Run them from the backend directory, e.g. ``python -m benchmarks.fuzzy``.
+"""
@@ -0,0 +1,76 @@
+"""Recall and latency of the IVF index against exact search on synthetic corpora.
+
+    python -m benchmarks.ann [--sizes 10000 100000 1000000] [--dim 256] [--k 10]
+
+1M x 1536 float32 needs 6 GB, so the default dimension is reduced; pass
+``--dim 1536`` on a machine with enough memory for production-sized rows.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import (
+    clustered_vectors,
+    percentiles,
+    perturbed_queries,
+    recall_at_k,
+    setup_django,
+    time_calls,
+)
+
+setup_django()
+
+from questions import ann  # noqa: E402
+from questions.ranking import top_k  # noqa: E402
+
+
+def exact_search(matrix, query, k):
+    return top_k(matrix @ query, k)
+
+
+def ivf_search(matrix, centroids, lists, query, k, nprobe):
+    rows = ann.candidates(centroids, lists, query, nprobe)
+    return rows[top_k(matrix[rows] @ query, k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'N':>9} {'mode':>12} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for size in args.sizes:
+        matrix = clustered_vectors(size, args.dim, rng)
+        queries = perturbed_queries(matrix, args.queries, rng)
+
+        # The arrays are passed as arguments, not closed over, so ``del`` below frees them
+        expected, latencies = time_calls(lambda m, q: exact_search(m, q, args.k), [(matrix, q) for q in queries])
+        stats = percentiles(latencies)
+        print(f"{size:>9} {'exact':>12} {1.0:>10.3f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+        started = time.perf_counter()
+        nlist = ann.default_nlist(size)
+        centroids = ann.train_centroids(matrix, nlist, iterations=10, seed=args.seed)
+        lists = ann.InvertedLists(ann.assign(matrix, centroids), nlist)
+        print(f"{size:>9} {'build':>12} {'':>10} {(time.perf_counter() - started) * 1000:>9.0f}  ({nlist} cells)")
+
+        for nprobe in args.nprobe:
+            found, latencies = time_calls(
+                lambda m, q: ivf_search(m, centroids, lists, q, args.k, nprobe),
+                [(matrix, q) for q in queries],
+            )
+            stats = percentiles(latencies)
+            recall = recall_at_k(found, expected)
+            print(f"{size:>9} {f'ivf/{nprobe}':>12} {recall:>10.3f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+        del matrix
+
+
+if __name__ == '__main__':
+    main()
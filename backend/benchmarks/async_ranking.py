@@ -0,0 +1,173 @@
+"""Throughput of the sync and async ranking endpoints against a slow embeddings API.
+
+    python -m benchmarks.async_ranking [--latency-ms 200] [--requests 200] [--concurrency 50]
+
+A stand-in for the OpenAI embeddings endpoint runs in a background thread
+and answers after ``--latency-ms``. The sync view is driven by
+``--workers`` threads, like that many sync server workers; the async view
+by ``--concurrency`` coroutines on one event loop, like a single ASGI
+worker. Every request uses a distinct query, so each one pays the
+embeddings round-trip. Runs against a throwaway in-memory database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.common import percentiles
+
+
+class EmbeddingsServer:
+    """Minimal OpenAI-compatible ``POST /embeddings`` server with injected latency."""
+
+    def __init__(self, dimensions, latency):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.port = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True).start()
+        self._ready.wait()
+        return f'http://127.0.0.1:{self.port}/v1'
+
+    async def _serve(self):
+        from questions.embeddings import LocalEmbeddingProvider
+
+        self.provider = LocalEmbeddingProvider(dimensions=self.dimensions)
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                payload = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(self.latency)
+
+                texts = payload['input'] if isinstance(payload['input'], list) else [payload['input']]
+                vectors = self.provider.embed(texts)
+                body = json.dumps({
+                    'object': 'list',
+                    'model': payload['model'],
+                    'data': [
+                        {'object': 'embedding', 'index': i, 'embedding': vector.tolist()}
+                        for i, vector in enumerate(vectors)
+                    ],
+                    'usage': {'prompt_tokens': 0, 'total_tokens': 0},
+                }).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode()
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def run_sync(url, headers, requests, workers):
+    from django.test import Client
+
+    def call(i):
+        started = time.perf_counter()
+        response = Client().post(url, {'query': f'sync topic {i}', 'limit': 10}, content_type='application/json', headers=headers)
+        assert response.status_code == 200, response.content
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(call, range(requests)))
+    return time.perf_counter() - started, np.asarray(latencies)
+
+
+async def run_async(url, headers, requests, concurrency):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                url, {'query': f'async topic {i}', 'limit': 10}, content_type='application/json', headers=headers
+            )
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call(i) for i in range(requests)))
+    return time.perf_counter() - started, np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--corpus', type=int, default=5000)
+    parser.add_argument('--dimensions', type=int, default=256)
+    args = parser.parse_args()
+
+    server = EmbeddingsServer(args.dimensions, args.latency_ms / 1000)
+    os.environ.update({
+        'EMBEDDING_BACKEND': 'openai',
+        'EMBEDDING_DIMENSIONS': str(args.dimensions),
+        'EMBEDDING_BASE_URL': server.start(),
+        'OPENAI_API_KEY': 'benchmark',
+    })
+
+    from benchmarks.common import setup_django, test_database
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from benchmarks.corpus import create_questions
+    from questions.ranking import ranking_index
+
+    with test_database():
+        create_questions(args.corpus, args.dimensions, np.random.default_rng(0))
+        user = User.objects.create_user('benchmark', password='benchmark')
+        ranking_index.invalidate()
+        ranking_index.snapshot()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+        print(f'{args.corpus} questions, embeddings latency {args.latency_ms:.0f} ms')
+        print(f"{'view':>6} {'in flight':>10} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+        results = [
+            ('sync', args.workers, run_sync('/api/questions/ranked/', headers, args.requests, args.workers)),
+            ('async', args.concurrency, asyncio.run(
+                run_async('/api/questions/ranked/async/', headers, args.requests, args.concurrency)
+            )),
+        ]
+        for view, in_flight, (elapsed, latencies) in results:
+            stats = percentiles(latencies)
+            print(
+                f'{view:>6} {in_flight:>10} {args.requests:>9} {args.requests / elapsed:>8.1f} '
+                f"{stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import contextlib
+import os
+import time
+
+import numpy as np
+
+
+def setup_django():
+    """Configure Django for benchmarks that import models or the ranking engine."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'question_ranker.settings')
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """A throwaway database (in-memory for SQLite), destroyed on exit."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+        teardown_test_environment()
+
+
+def clustered_vectors(count, dim, rng, clusters=None, spread=0.6):
+    """Unit vectors drawn around ``clusters`` random topic directions.
+
+    Real question embeddings are strongly clustered by topic; uniformly
+    random vectors would make every approximate index look bad.
+    """
+    clusters = clusters or max(1, int(np.sqrt(count)))
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    chunk = 65536
+    for start in range(0, count, chunk):
+        stop = min(start + chunk, count)
+        noise = rng.standard_normal((stop - start, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+        vectors[start:stop] = centers[rng.integers(0, clusters, stop - start)] + noise
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def perturbed_queries(matrix, count, rng, noise=0.5):
+    """Queries near (but not on) existing rows, like a topic typed by a player."""
+    base = matrix[rng.integers(0, len(matrix), count)]
+    queries = base + rng.standard_normal(base.shape, dtype=np.float32) * (noise / np.sqrt(matrix.shape[1]))
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def time_calls(fn, args_list):
+    """Run ``fn`` once per argument and return ``(results, latencies_in_ms)``."""
+    results = []
+    latencies = []
+    for args in args_list:
+        started = time.perf_counter()
+        results.append(fn(*args))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return results, np.asarray(latencies)
+
+
+def percentiles(latencies):
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def recall_at_k(found, expected):
+    """Mean fraction of the exact top-k ids that the approximate search returned."""
+    hits = [len(set(f.tolist()) & set(e.tolist())) / max(len(e), 1) for f, e in zip(found, expected)]
+    return float(np.mean(hits))
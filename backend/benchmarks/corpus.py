@@ -0,0 +1,108 @@
+"""Synthetic questions, players and game history for the benchmarks.
+
+Everything is derived from a seed, so two runs (or two commits) time the
+same data. Import after ``setup_django`` except for ``StubEmbeddingProvider``
+and ``question_items``, which only need NumPy.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from questions.embeddings import DEFAULT_DIMENSIONS, EmbeddingProvider
+
+TOPICS = ['history', 'science', 'geography', 'music', 'sports', 'film', 'literature', 'art']
+
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    """Instant offline embeddings: a random unit vector seeded by the text's hash."""
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f'stub-{dimensions}'
+
+    def embed(self, texts):
+        texts = list(texts)
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+            vectors[row] = np.random.default_rng(seed).standard_normal(self.dimensions, dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def question_items(count, dimensions, rng):
+    """Yield ``load_questions``-style dicts with random unit embeddings."""
+    for i in range(count):
+        vector = rng.standard_normal(dimensions, dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+        yield {
+            'question': f'Synthetic {TOPICS[i % len(TOPICS)]} question number {i}?',
+            'answer': f'answer {i}',
+            'embedding': vector.tolist(),
+        }
+
+
+def write_questions_file(path, count, dimensions, rng):
+    """Write ``count`` synthetic questions as JSON Lines for ``load_questions``."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in question_items(count, dimensions, rng):
+            f.write(json.dumps(item) + '\n')
+
+
+def create_questions(count, dimensions, rng, batch_size=1000):
+    """Bulk-insert ``count`` synthetic questions and return their ids."""
+    from questions.embeddings import text_hash
+    from questions.models import Question
+
+    questions = []
+    for item in question_items(count, dimensions, rng):
+        question = Question(question_text=item['question'], answer=item['answer'], content_key=text_hash(item['question']))
+        question.set_embedding(item['embedding'])
+        questions.append(question)
+    Question.objects.bulk_create(questions, batch_size=batch_size)
+    return list(Question.objects.values_list('id', flat=True))
+
+
+def create_history(question_ids, players, sessions_per_player, answers_per_session, rng, reports=0):
+    """Create players with finished games, answers and open reports; return the players."""
+    from django.contrib.auth.models import User
+
+    from questions import counters
+    from questions.models import Answer, GameSession, QuestionReport
+
+    User.objects.bulk_create([User(username=f'player{i}') for i in range(players)])
+    users = list(User.objects.filter(username__startswith='player').order_by('id'))
+
+    sessions = GameSession.objects.bulk_create([
+        GameSession(user=user, query=TOPICS[(user.id + i) % len(TOPICS)], total_questions=answers_per_session)
+        for user in users
+        for i in range(sessions_per_player)
+    ])
+
+    question_ids = np.asarray(question_ids)
+    answers = []
+    for session in sessions:
+        correct = rng.random(answers_per_session) < 0.6
+        for question_id, is_correct in zip(rng.choice(question_ids, answers_per_session), correct):
+            answers.append(Answer(
+                session=session,
+                question_id=int(question_id),
+                user_answer='guess',
+                is_correct=bool(is_correct),
+            ))
+        session.score = int(correct.sum())
+    Answer.objects.bulk_create(answers, batch_size=5000)
+    GameSession.objects.bulk_update(sessions, ['score'], batch_size=5000)
+
+    report_types = [choice[0] for choice in QuestionReport.REPORT_TYPES]
+    QuestionReport.objects.bulk_create([
+        QuestionReport(
+            user=users[i % len(users)],
+            question_id=int(question_ids[i % len(question_ids)]),
+            report_type=report_types[i % len(report_types)],
+        )
+        for i in range(reports)
+    ], ignore_conflicts=True)
+
+    counters.recount()
+    return users
@@ -0,0 +1,64 @@
+"""Throughput of the blockwise near-duplicate scan.
+
+    python -m benchmarks.duplicates [--sizes 10000 20000] [--dim 1536] [--processes 1 4]
+
+The scan is quadratic, so the time for a larger corpus is extrapolated as
+``seconds * (target / N) ** 2``; ``--target`` defaults to 500k questions.
+The peak tile column is the memory one similarity tile needs per process.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import clustered_vectors, setup_django
+
+setup_django()
+
+from questions import duplicates  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 20_000])
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--processes', type=int, nargs='+', default=sorted({1, min(4, os.cpu_count() or 1)}))
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--column-block', type=int, default=4096)
+    parser.add_argument('--threshold', type=float, default=0.95)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--target', type=int, default=500_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    tile_mb = args.block_size * args.column_block * 4 / 2**20
+    print(
+        f"{'N':>9} {'procs':>6} {'seconds':>9} {'pairs':>8} {'Mpairs/s':>9} "
+        f"{'tile MB':>8} {f'{args.target // 1000}k est':>10}"
+    )
+    for size in args.sizes:
+        matrix = clustered_vectors(size, args.dim, rng)
+        # Plant exact duplicates so the scan has something to report
+        planted = rng.choice(size, size // 100, replace=False)
+        matrix[planted] = matrix[(planted + 1) % size]
+        for processes in args.processes:
+            started = time.perf_counter()
+            pairs = sum(
+                len(rows)
+                for _, (rows, _, _) in duplicates.iter_duplicates(
+                    matrix, args.threshold, args.top,
+                    block_rows=args.block_size, column_block=args.column_block, processes=processes,
+                )
+            )
+            seconds = time.perf_counter() - started
+            estimate = seconds * (args.target / size) ** 2
+            print(
+                f"{size:>9} {processes:>6} {seconds:>9.2f} {pairs:>8} {size * (size - 1) / 2 / seconds / 1e6:>9.1f} "
+                f"{tile_mb:>8.0f} {estimate / 60:>8.0f} m"
+            )
+
+
+if __name__ == '__main__':
+    main()
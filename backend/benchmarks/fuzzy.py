@@ -0,0 +1,78 @@
+"""Micro-benchmark of answer grading against the original full Levenshtein DP.
+
+    python -m benchmarks.fuzzy [--pairs 2000] [--max-distance 2]
+"""
+import argparse
+import random
+import string
+import time
+
+from questions.fuzzy import (
+    banded_distance,
+    bit_parallel_distance,
+    levenshtein_distance,
+    within_distance,
+)
+
+
+def make_pairs(count, length, rng):
+    """Answer/typo pairs: half near misses, half unrelated strings of similar length."""
+    alphabet = string.ascii_lowercase + ' '
+    pairs = []
+    for i in range(count):
+        answer = ''.join(rng.choice(alphabet) for _ in range(length))
+        if i % 2:
+            typo = list(answer)
+            for _ in range(rng.randint(0, 3)):
+                typo[rng.randrange(len(typo))] = rng.choice(alphabet)
+            guess = ''.join(typo)
+        else:
+            guess = ''.join(rng.choice(alphabet) for _ in range(length + rng.randint(-2, 2)))
+        pairs.append((guess, answer))
+    return pairs
+
+
+def time_matcher(matcher, pairs):
+    started = time.perf_counter()
+    for a, b in pairs:
+        matcher(a, b)
+    return (time.perf_counter() - started) / len(pairs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=2000)
+    parser.add_argument('--max-distance', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    k = args.max_distance
+    matchers = {
+        'full DP': lambda a, b: levenshtein_distance(a, b) <= k,
+        'banded': lambda a, b: banded_distance(a, b, k) <= k,
+        'bit-parallel': lambda a, b: bit_parallel_distance(a, b, k) <= k,
+        'within_distance': lambda a, b: within_distance(a, b, k),
+    }
+
+    rng = random.Random(args.seed)
+    print(f"{'length':>8}" + ''.join(f'{name:>18}' for name in matchers) + f"{'speedup':>10}")
+    for length in (5, 10, 20, 40, 80, 160, 320, 1280, 2560):
+        # The full DP is quadratic; past a few hundred characters it only
+        # makes the run take minutes.
+        full_dp = length <= 320
+        pairs = make_pairs(args.pairs if full_dp else max(args.pairs // 20, 10), length, rng)
+        if full_dp:
+            for a, b in pairs:
+                assert within_distance(a, b, k) == (levenshtein_distance(a, b) <= k)
+        timings = {
+            name: time_matcher(matcher, pairs)
+            for name, matcher in matchers.items()
+            if full_dp or name != 'full DP'
+        }
+        row = ''.join(f'{timings[name]:>15.2f} us' if name in timings else f"{'-':>18}" for name in matchers)
+        speedup = f"{timings['full DP'] / timings['within_distance']:>9.1f}x" if full_dp else f"{'-':>10}"
+        print(f'{length:>8}' + row + speedup)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Build time, memory and query latency of the BM25 lexical index.
+
+    python -m benchmarks.lexical [--sizes 10000 100000] [--queries 200]
+
+Documents are drawn from a Zipf-distributed synthetic vocabulary, so a few
+terms have very long posting lists like real stop-word-free text. Queries
+are one to four words taken from random documents; the cost of a query is
+dominated by the posting lists of its most common terms.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles, setup_django, time_calls
+
+setup_django()
+
+from questions.lexical import _Postings  # noqa: E402
+
+
+def synthetic_documents(count, rng, vocabulary=50_000, words=14):
+    """``count`` question-plus-answer texts over a Zipf-distributed vocabulary."""
+    terms = np.array([f'w{i}' for i in range(vocabulary)])
+    lengths = rng.integers(words // 2, words * 2, count)
+    picks = np.minimum(rng.zipf(1.2, lengths.sum()), vocabulary) - 1
+    documents = []
+    start = 0
+    for length in lengths:
+        documents.append(' '.join(terms[picks[start:start + length]]))
+        start += length
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'N':>9} {'build s':>9} {'index MB':>9} {'terms':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for size in args.sizes:
+        documents = synthetic_documents(size, rng)
+        started = time.perf_counter()
+        postings = _Postings(np.arange(size), documents)
+        build = time.perf_counter() - started
+
+        queries = []
+        for row in rng.integers(0, size, args.queries):
+            words = documents[row].split()
+            queries.append(' '.join(rng.choice(words, min(len(words), rng.integers(1, 5)), replace=False)))
+        _, latencies = time_calls(lambda q: postings.search(q, args.limit), [(q,) for q in queries])
+        stats = percentiles(latencies)
+        print(
+            f"{size:>9} {build:>9.2f} {postings.nbytes / 2**20:>9.1f} {len(postings.terms):>8} "
+            f"{stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} {latencies.max():>9.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
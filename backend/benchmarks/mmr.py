@@ -0,0 +1,59 @@
+"""Added latency of the MMR diversity re-rank.
+
+    python -m benchmarks.mmr [--pool 200] [--dims 256 1536] [--limits 10 20]
+
+A request with ``diversity`` gathers the pool's vectors from the ranking
+matrix and runs ``ranking.mmr`` to pick one page; both are timed here.
+The synthetic corpus holds ``--paraphrases`` close variants of every
+question, so an undiversified top page is mostly repeats; the table also
+shows the mean pairwise similarity of a page before and after the re-rank.
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import clustered_vectors, percentiles, perturbed_queries, setup_django, time_calls
+
+setup_django()
+
+from questions.ranking import mmr, top_k  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=20_000, help='Questions in the synthetic corpus')
+    parser.add_argument('--paraphrases', type=int, default=5, help='Close variants of every question')
+    parser.add_argument('--pool', type=int, default=200)
+    parser.add_argument('--dims', type=int, nargs='+', default=[256, 1536])
+    parser.add_argument('--limits', type=int, nargs='+', default=[10, 20])
+    parser.add_argument('--diversity', type=float, default=0.5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'dim':>6} {'pool':>6} {'limit':>6} {'p50 ms':>9} {'p99 ms':>9} {'sim before':>11} {'sim after':>10}")
+    for dim in args.dims:
+        originals = clustered_vectors(args.size // args.paraphrases, dim, rng)
+        matrix = np.repeat(originals, args.paraphrases, axis=0)
+        matrix += rng.standard_normal(matrix.shape, dtype=np.float32) * (0.15 / np.sqrt(dim))
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        pools = [top_k(matrix @ query, args.pool) for query in perturbed_queries(matrix, args.queries, rng)]
+        for limit in args.limits:
+            picks, latencies = time_calls(lambda rows: mmr(matrix[rows], limit, args.diversity), [(p,) for p in pools])
+            stats = percentiles(latencies)
+
+            def mean_similarity(rows):
+                vectors = matrix[rows]
+                return (np.sum(vectors @ vectors.T) - len(rows)) / (len(rows) * (len(rows) - 1))
+
+            before = np.mean([mean_similarity(pool[:limit]) for pool in pools])
+            after = np.mean([mean_similarity(pool[chosen]) for pool, chosen in zip(pools, picks)])
+            print(
+                f"{dim:>6} {args.pool:>6} {limit:>6} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                f"{before:>11.3f} {after:>10.3f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
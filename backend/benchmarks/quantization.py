@@ -0,0 +1,80 @@
+"""Memory and recall-vs-speed of compressed first-pass scans.
+
+    python -m benchmarks.quantization [--sizes 10000 100000] [--dim 1536] [--prefix 0 512]
+
+Every mode scans compressed codes, keeps ``--candidates`` rows and re-ranks
+them with the float32 vectors, exactly like ``RankingIndex.search``.
+Synthetic vectors are not Matryoshka-trained, so prefix recall here is a
+lower bound; measure on real embeddings before lowering ``PREFIX_DIMS``.
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import (
+    clustered_vectors,
+    percentiles,
+    perturbed_queries,
+    recall_at_k,
+    setup_django,
+    time_calls,
+)
+
+setup_django()
+
+from questions import quantization  # noqa: E402
+from questions.ranking import top_k  # noqa: E402
+
+
+def compressed_search(matrix, codes, query, k, candidates):
+    rows = top_k(codes.score(query), max(k, candidates))
+    return rows[top_k(matrix[rows] @ query, k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--prefix', type=int, nargs='+', default=[0, 512])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--candidates', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(
+        f"{'N':>9} {'mode':>12} {'B/vector':>9} {'scan MB':>9} "
+        f"{'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9}"
+    )
+    for size in args.sizes:
+        matrix = clustered_vectors(size, args.dim, rng)
+        queries = perturbed_queries(matrix, args.queries, rng)
+
+        # The arrays are passed as arguments, not closed over, so ``del`` below frees them
+        expected, latencies = time_calls(lambda m, q: top_k(m @ q, args.k), [(matrix, q) for q in queries])
+        stats = percentiles(latencies)
+        print(
+            f"{size:>9} {'float32':>12} {matrix.nbytes // size:>9} {matrix.nbytes / 2**20:>9.1f} "
+            f"{1.0:>10.3f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+
+        for mode in quantization.ENCODINGS:
+            for prefix in args.prefix:
+                codes = quantization.encode(matrix, mode, prefix)
+                found, latencies = time_calls(
+                    lambda m, c, q: compressed_search(m, c, q, args.k, args.candidates),
+                    [(matrix, codes, q) for q in queries],
+                )
+                stats = percentiles(latencies)
+                label = f'{mode}/{codes.dims}'
+                print(
+                    f"{size:>9} {label:>12} {codes.nbytes // size:>9} {codes.nbytes / 2**20:>9.1f} "
+                    f"{recall_at_k(found, expected):>10.3f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+                )
+                del codes
+        del matrix
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Offline benchmark suite for the backend hot paths.
+
+    python -m benchmarks.suite [--sizes 1000 10000] [--output results.json] [--baseline old.json]
+
+For each corpus size a throwaway database is filled with synthetic data
+(see ``benchmarks.corpus``) and the following are timed through the Django
+test client, with a stub embedding provider so nothing touches the network:
+
+* ``load_questions`` into an empty table and again as a full re-load
+* the ranking endpoint, cold (new query each call), warm (repeated query)
+  and paging an existing ranking cursor
+* the ranking endpoint in lexical (BM25) and hybrid mode, new query each call
+* ``SubmitAnswersView`` with a 10-answer game
+* the admin question changelist
+* the admin ``stats_view``, with and without the cached snapshot
+
+Results are written as JSON (one record per benchmark and size, with the
+commit they were measured on); ``--baseline`` prints the p50 change
+against an earlier results file.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles, setup_django, test_database
+
+setup_django()
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from benchmarks.corpus import create_history, write_questions_file  # noqa: E402
+from questions.caching import query_embedding_cache, ranked_result_cache, ranking_cursors  # noqa: E402
+from questions.embeddings import get_embedding_provider  # noqa: E402
+from questions.models import Question  # noqa: E402
+from questions.ranking import ranking_index  # noqa: E402
+
+
+def measure(fn, runs, before=None):
+    """Call ``fn(i)`` ``runs`` times; return latency percentiles and queries per call.
+
+    ``before(i)``, if given, runs untimed ahead of each call.
+    """
+    latencies = []
+    queries = 0
+    for i in range(runs):
+        if before is not None:
+            before(i)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            fn(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries += len(context.captured_queries)
+    latencies = np.asarray(latencies)
+    return {
+        **percentiles(latencies),
+        'mean_ms': float(latencies.mean()),
+        'runs': runs,
+        'queries': queries / runs,
+    }
+
+
+def check(response, status=200):
+    assert response.status_code == status, (response.status_code, response.content[:200])
+    return response
+
+
+def load_questions(path):
+    call_command('load_questions', path=path, stdout=io.StringIO())
+
+
+def run_size(size, args):
+    """Build a corpus of ``size`` questions and return one result record per benchmark."""
+    rng = np.random.default_rng(args.seed)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'questions.jsonl')
+        write_questions_file(path, size, args.dimensions, rng)
+        # Each load starts from an empty table, so every run times the same work
+        results['load_questions'] = measure(
+            lambda i: load_questions(path),
+            args.load_runs,
+            before=lambda i: Question.objects.all().delete(),
+        )
+        results['load_questions_reload'] = measure(lambda i: load_questions(path), args.load_runs)
+
+    question_ids = list(Question.objects.values_list('id', flat=True))
+    players = create_history(
+        question_ids,
+        players=args.players,
+        sessions_per_player=args.sessions,
+        answers_per_session=10,
+        rng=rng,
+        reports=size // 100,
+    )
+    ranking_index.invalidate()
+    ranking_index.snapshot()
+
+    client = Client()
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(players[0]).access_token}'}
+
+    def rank(query, **extra):
+        return check(client.post(
+            '/api/questions/ranked/', {'query': query, 'limit': 20, **extra},
+            content_type='application/json', headers=headers,
+        )).json()
+
+    query_embedding_cache.clear()
+    ranked_result_cache.clear()
+    ranking_cursors.clear()
+    results['ranked_cold'] = measure(lambda i: rank(f'cold topic {i}'), args.runs)
+    results['ranked_warm'] = measure(lambda i: rank('warm topic'), args.runs)
+
+    results['ranked_lexical'] = measure(lambda i: rank(f'lexical topic {i}', mode='lexical'), args.runs)
+    results['ranked_hybrid'] = measure(lambda i: rank(f'hybrid topic {i}', mode='hybrid'), args.runs)
+
+    cursor = rank('cursor topic')['cursor']
+    results['ranked_cursor'] = measure(
+        lambda i: rank('cursor topic', cursor=cursor, offset=20 * (i % 9 + 1)), args.runs
+    )
+
+    def submit(i):
+        picked = rng.choice(question_ids, 10, replace=False)
+        answers = [{'question_id': int(question_id), 'answer': f'answer {i}'} for question_id in picked]
+        check(client.post(
+            '/api/questions/submit/', {'query': 'history', 'answers': answers},
+            content_type='application/json', headers=headers,
+        ), status=201)
+
+    results['submit_answers'] = measure(submit, args.runs)
+
+    admin = User.objects.create_superuser('benchmark-admin', password='benchmark')
+    admin_client = Client()
+    admin_client.force_login(admin)
+    results['admin_changelist'] = measure(lambda i: check(admin_client.get('/admin/questions/question/')), args.runs)
+
+    def stats_cold(i):
+        cache.clear()
+        check(admin_client.get('/admin/stats/'))
+
+    results['admin_stats_cold'] = measure(stats_cold, args.runs)
+    results['admin_stats_cached'] = measure(lambda i: check(admin_client.get('/admin/stats/')), args.runs)
+
+    return [{'benchmark': name, 'size': size, **stats} for name, stats in results.items()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    print(f"\n{'benchmark':>22} {'N':>8} {'base p50':>9} {'p50':>9} {'change':>8}")
+    for record in results:
+        before = baseline.get((record['benchmark'], record['size']))
+        if before is None:
+            continue
+        change = (record['p50_ms'] / before['p50_ms'] - 1) * 100 if before['p50_ms'] else 0
+        print(
+            f"{record['benchmark']:>22} {record['size']:>8} {before['p50_ms']:>9.2f} "
+            f"{record['p50_ms']:>9.2f} {change:>+7.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--dimensions', type=int, default=256)
+    parser.add_argument('--runs', type=int, default=30, help='Calls per request benchmark')
+    parser.add_argument('--load-runs', type=int, default=2, help='Calls per load_questions benchmark')
+    parser.add_argument('--players', type=int, default=50)
+    parser.add_argument('--sessions', type=int, default=20, help='Finished games per player')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    settings.EMBEDDINGS = {
+        'BACKEND': 'benchmarks.corpus.StubEmbeddingProvider',
+        'OPTIONS': {'dimensions': args.dimensions},
+    }
+    get_embedding_provider.cache_clear()
+
+    results = []
+    print(f"{'benchmark':>22} {'N':>8} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    with test_database():
+        for size in args.sizes:
+            call_command('flush', interactive=False, verbosity=0)
+            for record in run_size(size, args):
+                results.append(record)
+                print(
+                    f"{record['benchmark']:>22} {size:>8} {record['p50_ms']:>9.2f} "
+                    f"{record['p99_ms']:>9.2f} {record['queries']:>8.1f}"
+                )
+
+    output = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'arguments': vars(args),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'\nWrote {args.output}')
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'questions.metrics.MetricsMiddleware',  # Outermost, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -131,6 +132,88 @@ STATIC_URL = 'static/'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Embedding provider used for queries and for the data pipeline. 'openai'
+# calls the OpenAI API; 'local' is a deterministic offline provider for
+# development, CI and load tests. A dotted path selects a custom provider.
+EMBEDDINGS = {
+    'BACKEND': os.getenv('EMBEDDING_BACKEND', 'openai'),
+    'MODEL': os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small'),
+    'DIMENSIONS': int(os.getenv('EMBEDDING_DIMENSIONS', '1536')),
+    'TIMEOUT': float(os.getenv('EMBEDDING_TIMEOUT', '10')),
+    'MAX_RETRIES': int(os.getenv('EMBEDDING_MAX_RETRIES', '2')),
+    'BATCH_SIZE': int(os.getenv('EMBEDDING_BATCH_SIZE', '256')),
+    'BASE_URL': os.getenv('EMBEDDING_BASE_URL') or None,
+}
+
+# Question ranking. 'exact' scores every question; 'ivf' uses the
+# approximate index written by `manage.py build_ann_index` once the corpus
+# has EXACT_THRESHOLD questions. Either way each worker keeps the matrix in
+# memory: a new question is appended into spare rows, but re-embedding or
+# deleting one copies the whole matrix (and compressed codes are copied on
+# every save), so bulk changes belong in load_questions, which rebuilds once. Higher IVF_NPROBE means better recall and
+# slower queries. COMPRESSION ('none', 'int8' or 'binary') scans compressed
+# codes over the first PREFIX_DIMS dimensions (0 = all) and re-ranks the best
+# RERANK_CANDIDATES rows exactly; see benchmarks/quantization.py.
+# SHARED_SNAPSHOT makes every worker memory-map one on-disk copy of the
+# embedding matrix instead of building its own (recommended with several
+# gunicorn/uvicorn workers). Every SNAPSHOT_POLL_INTERVAL seconds each worker
+# also checks the shared corpus version, so results it cached are retired
+# after another process (a worker, load_questions) changed the questions.
+# Identical concurrent ranking requests share one computation; followers
+# wait at most COALESCE_TIMEOUT seconds before computing on their own.
+# MODE is the default for requests that do not pick one: 'semantic'
+# (embeddings), 'lexical' (in-memory BM25, no network) or 'hybrid' (both,
+# fused by reciprocal rank). Semantic and hybrid rankings fall back to
+# lexical when the embeddings backend fails.
+# Requests with a `diversity` re-rank each page by maximal marginal relevance
+# over the next DIVERSITY_POOL candidates (see benchmarks/mmr.py).
+RANKING = {
+    'BACKEND': os.getenv('RANKING_BACKEND', 'exact'),
+    'IVF_PATH': os.getenv('RANKING_IVF_PATH', str(BASE_DIR / 'ranking_index' / 'ivf.npz')),
+    'IVF_NPROBE': int(os.getenv('RANKING_IVF_NPROBE', '16')),
+    'EXACT_THRESHOLD': int(os.getenv('RANKING_EXACT_THRESHOLD', '50000')),
+    'COMPRESSION': os.getenv('RANKING_COMPRESSION', 'none'),
+    'PREFIX_DIMS': int(os.getenv('RANKING_PREFIX_DIMS', '0')),
+    'RERANK_CANDIDATES': int(os.getenv('RANKING_RERANK_CANDIDATES', '200')),
+    'SHARED_SNAPSHOT': os.getenv('RANKING_SHARED_SNAPSHOT', 'false').lower() == 'true',
+    'SNAPSHOT_DIR': os.getenv('RANKING_SNAPSHOT_DIR', str(BASE_DIR / 'ranking_index' / 'snapshots')),
+    'SNAPSHOT_POLL_INTERVAL': float(os.getenv('RANKING_SNAPSHOT_POLL_INTERVAL', '1')),
+    'COALESCE_TIMEOUT': float(os.getenv('RANKING_COALESCE_TIMEOUT', '10')),
+    'MODE': os.getenv('RANKING_MODE', 'semantic'),
+    'DIVERSITY_POOL': int(os.getenv('RANKING_DIVERSITY_POOL', '200')),
+    'EXCLUDE_SEEN': os.getenv('RANKING_EXCLUDE_SEEN', 'false').lower() == 'true',
+}
+
+# Question embeddings are stored as raw float32 bytes; float16 halves the
+# size at a small precision cost.
+EMBEDDING_STORAGE_DTYPE = os.getenv('EMBEDDING_STORAGE_DTYPE', 'float32')
+
+# Number of query embeddings kept in each worker's in-memory LRU, in front of
+# the QueryEmbedding table.
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+
+# Ranked id lists kept per worker, keyed by query, limit and corpus version.
+RANKED_RESULT_CACHE_SIZE = int(os.getenv('RANKED_RESULT_CACHE_SIZE', '4096'))
+
+# Ranking cursors: the first ranking request stores the top
+# RANKING_CURSOR_DEPTH ids for the query, so later rounds on the same topic
+# page through them by offset. Cursors live RANKING_CURSOR_TTL seconds and
+# each worker keeps at most RANKING_CURSOR_MAX_BYTES of them (8 bytes per id).
+RANKING_CURSOR_DEPTH = int(os.getenv('RANKING_CURSOR_DEPTH', '200'))
+RANKING_CURSOR_TTL = int(os.getenv('RANKING_CURSOR_TTL', '1800'))
+RANKING_CURSOR_MAX_BYTES = int(os.getenv('RANKING_CURSOR_MAX_BYTES', str(16 * 1024 * 1024)))
+
+# Per-player sets of answered questions, used by rankings that exclude
+# questions the player has already seen. Each worker keeps up to
+# SEEN_QUESTIONS_CACHE_SIZE players and re-reads a set from the database
+# after SEEN_QUESTIONS_TTL seconds, picking up games submitted to other workers.
+SEEN_QUESTIONS_CACHE_SIZE = int(os.getenv('SEEN_QUESTIONS_CACHE_SIZE', '10000'))
+SEEN_QUESTIONS_TTL = int(os.getenv('SEEN_QUESTIONS_TTL', '300'))
+
+# Seconds the admin statistics dashboard is served from a cached snapshot
+# before it is recomputed.
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
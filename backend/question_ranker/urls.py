@@ -18,10 +18,12 @@ from django.contrib import admin
 from django.urls import include, path
 
 from questions.admin import admin_site
+from questions.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin_site.urls),  # Custom admin with stats
     path('django-admin/', admin.site.urls),  # Default Django admin (backup)
     path('api/auth/', include('users.urls')),
     path('api/questions/', include('questions.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape target
 ]
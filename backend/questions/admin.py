@@ -1,14 +1,24 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group, User
-from django.db.models import Avg, Count
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField
+from django.db.models.functions import Cast, NullIf
 from django.db.models.functions import TruncDate
+from django.shortcuts import redirect
 from django.template.response import TemplateResponse
-from django.urls import path
+from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.utils.html import escape, format_html, mark_safe
+from django.views.decorators.http import require_POST
 
+from .caching import query_embedding_cache, ranked_result_cache, ranking_cursors
+from .coalescing import ranking_flight
+from .counters import recount
 from .models import Answer, GameSession, Question, QuestionReport
+from .seen import seen_questions
 
 
 @admin.register(Question)
@@ -16,7 +26,7 @@ class QuestionAdmin(admin.ModelAdmin):
     list_display = ['id', 'question_text_short', 'answer', 'times_answered', 'accuracy_rate', 'report_count']
     list_filter = ['id']
     search_fields = ['question_text', 'answer']
-    readonly_fields = ['embedding', 'stats_display']
+    readonly_fields = ['embedding_summary', 'stats_display']
     fieldsets = (
         (None, {
             'fields': ('question_text', 'answer')
@@ -26,7 +36,7 @@ class QuestionAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Technical', {
-            'fields': ('embedding',),
+            'fields': ('embedding_summary',),
             'classes': ('collapse',)
         }),
     )
@@ -35,35 +45,53 @@ class QuestionAdmin(admin.ModelAdmin):
         return obj.question_text[:80] + '...' if len(obj.question_text) > 80 else obj.question_text
     question_text_short.short_description = 'Question'
 
+    def get_queryset(self, request):
+        # Statistics come from the denormalized counters on Question, and the
+        # embedding blob is never needed for display.
+        return (
+            super().get_queryset(request)
+            .defer('embedding')
+            .annotate(
+                _accuracy=Cast(F('correct_count'), FloatField()) * 100 / NullIf(F('times_answered'), 0),
+            )
+        )
+
     def times_answered(self, obj):
-        return obj.user_answers.count()
+        return obj.times_answered
     times_answered.short_description = 'Times Answered'
+    times_answered.admin_order_field = 'times_answered'
 
     def accuracy_rate(self, obj):
-        answers = obj.user_answers.all()
-        total = answers.count()
-        if total == 0:
+        rate = obj.accuracy
+        if rate is None:
             return '-'
-        correct = answers.filter(is_correct=True).count()
-        rate = (correct / total) * 100
         color = 'green' if rate >= 70 else 'orange' if rate >= 40 else 'red'
         return format_html('<span style="color: {};">{}</span>', color, f'{rate:.1f}%')
     accuracy_rate.short_description = 'Accuracy'
+    accuracy_rate.admin_order_field = '_accuracy'
 
     def report_count(self, obj):
-        count = obj.reports.filter(resolved=False).count()
+        count = obj.open_report_count
         if count > 0:
             return format_html('<span style="color: red; font-weight: bold;">{}</span>', count)
         return 0
     report_count.short_description = 'Open Reports'
+    report_count.admin_order_field = 'open_report_count'
 
     def stats_display(self, obj):
-        answers = obj.user_answers.all()
-        total = answers.count()
-        correct = answers.filter(is_correct=True).count()
+        total = obj.times_answered
+        correct = obj.correct_count
         return f"Total answers: {total}, Correct: {correct}, Incorrect: {total - correct}"
     stats_display.short_description = 'Answer Statistics'
 
+    def embedding_summary(self, obj):
+        if not obj.embedding:
+            return '-'
+        vector = obj.vector
+        preview = ', '.join(f'{value:.4f}' for value in vector[:8])
+        return f"{vector.shape[0]} dims ({obj.embedding_dtype}, {len(obj.embedding)} bytes): [{preview}, ...]"
+    embedding_summary.short_description = 'Embedding'
+
 
 @admin.register(QuestionReport)
 class QuestionReportAdmin(admin.ModelAdmin):
@@ -98,12 +126,16 @@ class QuestionReportAdmin(admin.ModelAdmin):
 
     @admin.action(description='Mark selected reports as resolved')
     def mark_resolved(self, request, queryset):
+        question_ids = set(queryset.values_list('question_id', flat=True))
         updated = queryset.update(resolved=True)
+        recount(question_ids, fields=['open_report_count'])
         self.message_user(request, f'{updated} reports marked as resolved.')
 
     @admin.action(description='Mark selected reports as unresolved')
     def mark_unresolved(self, request, queryset):
+        question_ids = set(queryset.values_list('question_id', flat=True))
         updated = queryset.update(resolved=False)
+        recount(question_ids, fields=['open_report_count'])
         self.message_user(request, f'{updated} reports marked as unresolved.')
 
 
@@ -178,6 +210,19 @@ class AnswerAdmin(admin.ModelAdmin):
         return text[:50] + '...' if len(text) > 50 else text
     question_short.short_description = 'Question'
 
+    # Answers have no delete signal (see questions.signals), so recount here
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recount([obj.question_id], fields=['times_answered', 'correct_count'])
+
+    def delete_queryset(self, request, queryset):
+        question_ids = set(queryset.values_list('question_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recount(question_ids, fields=['times_answered', 'correct_count'])
+
+
+STATS_CACHE_KEY = 'questions:admin_stats_snapshot'
+
 
 class QuestionRankerAdminSite(admin.AdminSite):
     site_header = 'Question Ranker Admin'
@@ -188,10 +233,12 @@ class QuestionRankerAdminSite(admin.AdminSite):
         urls = super().get_urls()
         custom_urls = [
             path('stats/', self.admin_view(self.stats_view), name='stats'),
+            path('stats/refresh/', self.admin_view(self.stats_refresh_view), name='stats_refresh'),
         ]
         return custom_urls + urls
 
-    def stats_view(self, request):
+    def build_stats_snapshot(self):
+        """Compute the dashboard statistics. Expensive; see ``get_stats_snapshot``."""
         # Get date range (last 30 days)
         end_date = timezone.now()
         start_date = end_date - timezone.timedelta(days=30)
@@ -236,26 +283,23 @@ class QuestionRankerAdminSite(admin.AdminSite):
             .order_by('-count')[:10]
         )
 
-        # Most difficult questions (lowest accuracy)
-        difficult_questions = []
-        for q in Question.objects.annotate(answer_count=Count('user_answers')).filter(answer_count__gte=5):
-            total = q.user_answers.count()
-            correct = q.user_answers.filter(is_correct=True).count()
-            accuracy = (correct / total) * 100 if total > 0 else 0
-            difficult_questions.append({
-                'question': q,
-                'accuracy': accuracy,
-                'total': total
-            })
-        difficult_questions.sort(key=lambda x: x['accuracy'])
-        difficult_questions = difficult_questions[:10]
+        # Most difficult questions (lowest accuracy), ranked entirely in SQL
+        hardest = (
+            Question.objects
+            .only('id', 'question_text', 'answer', 'times_answered', 'correct_count')
+            .filter(times_answered__gte=5)
+            .annotate(accuracy_pct=Cast(F('correct_count'), FloatField()) * 100 / F('times_answered'))
+            .order_by('accuracy_pct', 'id')[:10]
+        )
+        difficult_questions = [
+            {'question': q, 'accuracy': q.accuracy_pct, 'total': q.times_answered}
+            for q in hardest
+        ]
 
         # Recent activity
-        recent_games = GameSession.objects.order_by('-created_at')[:10]
+        recent_games = GameSession.objects.select_related('user').order_by('-created_at')[:10]
 
-        context = {
-            **self.each_context(request),
-            'title': 'Traffic Statistics',
+        return {
             'daily_games': list(daily_games),
             'total_games': total_games,
             'total_users': total_users,
@@ -266,11 +310,38 @@ class QuestionRankerAdminSite(admin.AdminSite):
             'report_types': list(report_types),
             'top_topics': list(top_topics),
             'difficult_questions': difficult_questions,
-            'recent_games': recent_games,
+            'recent_games': list(recent_games),
+            'generated_at': timezone.now(),
+        }
+
+    def get_stats_snapshot(self, refresh=False):
+        """Return the cached statistics snapshot, rebuilding it when stale or on request."""
+        snapshot = None if refresh else cache.get(STATS_CACHE_KEY)
+        if snapshot is None:
+            snapshot = self.build_stats_snapshot()
+            cache.set(STATS_CACHE_KEY, snapshot, settings.STATS_CACHE_TTL)
+        return snapshot
+
+    def stats_view(self, request):
+        context = {
+            **self.each_context(request),
+            'title': 'Traffic Statistics',
+            **self.get_stats_snapshot(),
+            'stats_cache_ttl': settings.STATS_CACHE_TTL,
+            'embedding_cache': query_embedding_cache.stats(),
+            'result_cache': ranked_result_cache.stats(),
+            'ranking_cursors': ranking_cursors.stats(),
+            'ranking_flight': ranking_flight.stats(),
+            'seen_questions': seen_questions.stats(),
         }
 
         return TemplateResponse(request, 'admin/stats.html', context)
 
+    @method_decorator(require_POST)
+    def stats_refresh_view(self, request):
+        self.get_stats_snapshot(refresh=True)
+        return redirect(reverse('admin:stats', current_app=self.name))
+
 
 # Create custom admin site instance
 admin_site = QuestionRankerAdminSite(name='question_ranker_admin')
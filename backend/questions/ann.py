@@ -0,0 +1,96 @@
+"""Inverted-file (IVF) approximate nearest-neighbour search.
+
+The corpus is partitioned with spherical k-means into ``nlist`` cells.
+A query only scores the rows of the ``nprobe`` cells whose centroids are
+closest to it, trading a little recall for a scan that is roughly
+``nprobe / nlist`` of the exact one. Everything is plain NumPy and works
+on the pre-normalized matrix owned by ``questions.ranking``.
+"""
+import os
+
+import numpy as np
+
+ASSIGN_CHUNK_ROWS = 16384
+
+
+def default_nlist(count):
+    """A common rule of thumb: about 4 * sqrt(N) cells."""
+    return max(1, int(4 * np.sqrt(count)))
+
+
+def assign(matrix, centroids):
+    """Return the index of the closest centroid for every row of ``matrix``."""
+    labels = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), ASSIGN_CHUNK_ROWS):
+        block = matrix[start:start + ASSIGN_CHUNK_ROWS]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(matrix, nlist, iterations=20, sample_size=None, seed=0):
+    """Spherical k-means over (a sample of) the unit-length rows of ``matrix``."""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(matrix))
+    sample_size = sample_size or max(nlist * 64, 10000)
+    if len(matrix) > sample_size:
+        sample = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+    else:
+        sample = matrix
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(sample, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        order = np.argsort(labels, kind='stable')
+        nonempty = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+
+        # Re-seed empty cells with random points so every cell stays useful
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class InvertedLists:
+    """Row positions grouped by cell: rows of cell ``c`` are ``order[offsets[c]:offsets[c + 1]]``."""
+
+    __slots__ = ('order', 'offsets')
+
+    def __init__(self, labels, nlist):
+        self.order = np.argsort(labels, kind='stable')
+        self.offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=self.offsets[1:])
+
+    def rows(self, cells):
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+
+
+def candidates(centroids, lists, query, nprobe):
+    """Row positions in the ``nprobe`` cells whose centroids are closest to ``query``."""
+    nprobe = min(nprobe, len(centroids))
+    cell_scores = centroids @ query
+    cells = np.argpartition(cell_scores, len(cell_scores) - nprobe)[len(cell_scores) - nprobe:]
+    return lists.rows(cells)
+
+
+def save(path, centroids, ids, labels):
+    """Persist trained centroids and the cell of every question id."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, centroids=centroids, ids=ids, labels=labels)
+    os.replace(tmp_path, path)
+
+
+def load(path):
+    """Return ``(centroids, ids, labels)`` from ``save``, or ``None`` if there is no index yet."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return data['centroids'], data['ids'], data['labels']
@@ -0,0 +1,288 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import QueryEmbedding, encode_embedding
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_query(query):
+    """Collapse case and whitespace so trivially different queries share a key."""
+    return ' '.join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings keyed by normalized query and model.
+
+    The first tier is an in-process LRU. The second is the QueryEmbedding
+    table, which survives restarts and is shared by every worker that talks
+    to the same database.
+    """
+
+    def __init__(self, max_entries):
+        self.memory = LRUCache(max_entries)
+        self.persistent_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query, model):
+        return hashlib.sha256(f'{model}\0{normalize_query(query)}'.encode()).hexdigest()
+
+    def get_or_compute(self, query, model, compute):
+        """Return the embedding for ``query``, calling ``compute(query)`` only on a miss."""
+        key = self.make_key(query, model)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = self._load(key)
+        if vector is not None:
+            return vector
+
+        with self._lock:
+            self.misses += 1
+        vector = np.asarray(compute(query), dtype=np.float32)
+        self._store(key, model, query, vector)
+        return vector
+
+    async def aget_or_compute(self, query, model, compute):
+        """Async ``get_or_compute``: awaits ``compute(query)`` and runs the table lookups in a thread."""
+        key = self.make_key(query, model)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = await sync_to_async(self._load)(key)
+        if vector is not None:
+            return vector
+
+        with self._lock:
+            self.misses += 1
+        vector = np.asarray(await compute(query), dtype=np.float32)
+        await sync_to_async(self._store)(key, model, query, vector)
+        return vector
+
+    def _load(self, key):
+        try:
+            stored = QueryEmbedding.objects.filter(key=key).first()
+        except DatabaseError:
+            stored = None
+        if stored is None:
+            return None
+        with self._lock:
+            self.persistent_hits += 1
+        vector = stored.vector
+        self.memory.set(key, vector)
+        return vector
+
+    def _store(self, key, model, query, vector):
+        self.memory.set(key, vector)
+        try:
+            QueryEmbedding.objects.bulk_create(
+                [QueryEmbedding(
+                    key=key,
+                    model=model,
+                    query=normalize_query(query),
+                    embedding=encode_embedding(vector, 'float32'),
+                )],
+                ignore_conflicts=True,
+            )
+        except DatabaseError:
+            pass
+
+    def stats(self):
+        lookups = self.memory.hits + self.persistent_hits + self.misses
+        hits = self.memory.hits + self.persistent_hits
+        return {
+            'memory_hits': self.memory.hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'memory_entries': len(self.memory),
+            'hit_rate': (hits / lookups) * 100 if lookups else 0,
+        }
+
+    def clear(self):
+        self.memory.clear()
+
+
+class RankedResultCache:
+    """In-process LRU of ranked question ids per (query, mode, limit, corpus version).
+
+    A ranking only changes when the question set does, so entries are keyed
+    by ``RankingIndex.corpus_version()``; entries for older versions are
+    never looked up again and age out of the LRU.
+    """
+
+    def __init__(self, max_entries):
+        self.memory = LRUCache(max_entries)
+
+    @staticmethod
+    def make_key(query, mode, model, limit, corpus_version):
+        return (mode, model, normalize_query(query), limit, corpus_version)
+
+    def get(self, key):
+        return self.memory.get(key)
+
+    def set(self, key, ids):
+        self.memory.set(key, tuple(ids))
+
+    def stats(self):
+        lookups = self.memory.hits + self.memory.misses
+        return {
+            'hits': self.memory.hits,
+            'misses': self.memory.misses,
+            'entries': len(self.memory),
+            'hit_rate': (self.memory.hits / lookups) * 100 if lookups else 0,
+        }
+
+    def clear(self):
+        self.memory.clear()
+
+
+class RankingCursor:
+    """One stored ranking: question ``ids`` in the order they are served.
+
+    ``ranked_by`` is the mode that actually produced the ids, which differs
+    from the requested one after a fallback. With a diversity re-rank, the
+    first ``diversified`` ids are already in their final order.
+    """
+
+    __slots__ = ('token', 'key', 'expires', 'ids', 'ranked_by', 'diversified')
+
+    def __init__(self, token, key, expires, ids, ranked_by):
+        self.token = token
+        self.key = key
+        self.expires = expires
+        self.ids = ids
+        self.ranked_by = ranked_by
+        self.diversified = 0
+
+
+class RankingCursorStore:
+    """Server-side rankings behind the opaque cursors handed to clients.
+
+    The first ranking request stores a deep ordering of question ids and
+    returns a token for it; later requests page through that ordering by
+    offset instead of embedding and scanning again. Orderings expire
+    ``ttl`` seconds after creation and the oldest are dropped once they
+    hold more than ``max_bytes`` of ids. A cursor pins the ordering it was
+    created with, so questions added meanwhile only show up in new cursors,
+    and only answers for the ``key`` (query and ranking options) it was
+    created under.
+    """
+
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def create(self, key, ids, ranked_by):
+        """Store the ranking ``ids`` under ``key`` and return the new ``RankingCursor``."""
+        now = time.monotonic()
+        cursor = RankingCursor(
+            secrets.token_urlsafe(16), key, now + self.ttl, np.asarray(ids, dtype=np.int64), ranked_by
+        )
+        with self._lock:
+            self._data[cursor.token] = cursor
+            self.nbytes += cursor.ids.nbytes
+            # Entries are created in expiry order, so the oldest go first
+            while self._data:
+                oldest = next(iter(self._data.values()))
+                if oldest.expires > now and self.nbytes <= self.max_bytes:
+                    break
+                self._data.popitem(last=False)
+                self.nbytes -= oldest.ids.nbytes
+                if oldest.expires > now:
+                    self.evicted += 1
+        return cursor
+
+    def get(self, token, key):
+        """The cursor for ``token``, or None when it is unknown, expired or was created under another ``key``."""
+        with self._lock:
+            cursor = self._data.get(token)
+            if cursor is not None and cursor.expires <= time.monotonic():
+                del self._data[token]
+                self.nbytes -= cursor.ids.nbytes
+                cursor = None
+            if cursor is None or cursor.key != key:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return cursor
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+            'entries': len(self._data),
+            'bytes': self.nbytes,
+            'hit_rate': (self.hits / lookups) * 100 if lookups else 0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+
+query_embedding_cache = QueryEmbeddingCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+ranked_result_cache = RankedResultCache(settings.RANKED_RESULT_CACHE_SIZE)
+ranking_cursors = RankingCursorStore(settings.RANKING_CURSOR_TTL, settings.RANKING_CURSOR_MAX_BYTES)
@@ -0,0 +1,124 @@
+"""Single-flight coalescing of identical concurrent computations.
+
+When a topic trends, many players ask for the same ranking at the same
+moment. ``SingleFlight`` lets the first request for a key compute it while
+every identical request that arrives meanwhile waits for, and shares, that
+result. Followers wait at most ``timeout`` seconds and then compute on
+their own, so a stuck leader cannot hold them forever.
+"""
+import asyncio
+import concurrent.futures
+import threading
+
+from django.conf import settings
+
+_ABANDONED = object()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Per-key deduplication of in-flight calls, for threads (``do``) and coroutines (``ado``)."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.executed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return ``fn()``, sharing one call among concurrent callers with the same ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key, fn):
+        """Async ``do``: awaits ``fn()`` once per key among the coroutines of every event loop.
+
+        Under WSGI each async view runs on an event loop of its own, so the
+        shared result is a thread-safe ``concurrent.futures.Future`` that
+        each follower awaits on its own loop.
+        """
+        with self._lock:
+            future = self._async_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[key] = concurrent.futures.Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # The leader's client went away; followers compute for themselves
+                future.set_result(_ABANDONED)
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    del self._async_calls[key]
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            return await fn()
+        if result is _ABANDONED:
+            return await fn()
+        return result
+
+    def stats(self):
+        requests = self.executed + self.coalesced
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'in_flight': len(self._calls) + len(self._async_calls),
+            'coalesced_rate': (self.coalesced / requests) * 100 if requests else 0,
+        }
+
+
+ranking_flight = SingleFlight(settings.RANKING['COALESCE_TIMEOUT'])
@@ -0,0 +1,91 @@
+"""Denormalized per-question answer and report counters.
+
+``Question.times_answered``, ``correct_count`` and ``open_report_count``
+are maintained incrementally with ``F()`` updates on the write paths, so
+readers never have to count Answer or QuestionReport rows. ``recount``
+rebuilds them from the raw rows (see the ``rebuild_question_counters``
+management command).
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Answer, Question, QuestionReport
+
+
+def record_answers(answers):
+    """Add a batch of new Answers to their questions' counters in a single UPDATE."""
+    totals = Counter()
+    correct = Counter()
+    for answer in answers:
+        totals[answer.question_id] += 1
+        if answer.is_correct:
+            correct[answer.question_id] += 1
+    if not totals:
+        return
+
+    def increments(counts):
+        return Case(
+            *[When(id=question_id, then=Value(count)) for question_id, count in counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    Question.objects.filter(id__in=list(totals)).update(
+        times_answered=F('times_answered') + increments(totals),
+        correct_count=F('correct_count') + increments(correct),
+    )
+
+
+def record_open_report(question_id, delta=1):
+    Question.objects.filter(id=question_id).update(open_report_count=F('open_report_count') + delta)
+
+
+def _counted(queryset):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(question=OuterRef('pk'))
+            .order_by()
+            .values('question')
+            .annotate(count=Count('id'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def expected_counters():
+    """Counter values computed from the raw Answer and QuestionReport rows."""
+    return {
+        'times_answered': _counted(Answer.objects.all()),
+        'correct_count': _counted(Answer.objects.filter(is_correct=True)),
+        'open_report_count': _counted(QuestionReport.objects.filter(resolved=False)),
+    }
+
+
+def recount(question_ids=None, fields=None):
+    """Rebuild counters from raw rows, for all questions or only ``question_ids``."""
+    expressions = expected_counters()
+    if fields is not None:
+        expressions = {name: expressions[name] for name in fields}
+    questions = Question.objects.all()
+    if question_ids is not None:
+        questions = questions.filter(id__in=list(question_ids))
+    return questions.update(**expressions)
+
+
+def mismatches():
+    """Questions whose stored counters disagree with the raw rows."""
+    expected = {f'expected_{name}': expression for name, expression in expected_counters().items()}
+    disagree = Q()
+    for name in expected_counters():
+        disagree |= ~Q(**{name: F(f'expected_{name}')})
+    return (
+        Question.objects
+        .annotate(**expected)
+        .filter(disagree)
+        .values('id', 'times_answered', 'correct_count', 'open_report_count', *expected)
+    )
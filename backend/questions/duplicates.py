@@ -0,0 +1,101 @@
+"""Blockwise near-duplicate search over the normalized embedding matrix.
+
+Comparing every question with every other one is an N x N similarity
+matrix, far too large to hold for big corpora. Instead, ``block_rows`` rows
+at a time are compared with the rows after them, ``column_block`` columns
+at a time, so peak memory is one ``block_rows x column_block`` tile no
+matter how large N is. Each pair is considered once (``i < j``) and every
+row keeps at most ``top_m`` partners above the threshold.
+
+Row blocks are independent, so they can be spread over worker processes,
+which read the matrix from a memory-mapped ``.npy`` file instead of
+receiving a copy each. Like ``questions.ann``, this module is plain NumPy
+and does not touch the database.
+"""
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+_worker_matrix = None
+
+
+def _top_per_row(rows, cols, scores, top_m):
+    """Keep the ``top_m`` highest-scoring pairs of every row, ordered by row then score."""
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < top_m
+    return rows[keep], cols[keep], scores[keep]
+
+
+def scan_rows(matrix, start, stop, threshold, top_m, column_block=4096):
+    """Pairs ``(i, j, similarity)`` with ``start <= i < stop``, ``i < j`` and similarity >= ``threshold``.
+
+    Returned as three arrays of row positions and scores, at most ``top_m``
+    pairs per ``i``.
+    """
+    block = np.asarray(matrix[start:stop], dtype=np.float32)
+    block_ids = np.arange(start, stop)[:, np.newaxis]
+    found_rows, found_cols, found_scores = [], [], []
+    pending = 0
+    for column_start in range(start, len(matrix), column_block):
+        column_stop = min(column_start + column_block, len(matrix))
+        similarities = block @ np.asarray(matrix[column_start:column_stop], dtype=np.float32).T
+        if column_start < stop:
+            # Tiles on the diagonal also hold j <= i: self-matches and pairs seen from the other side
+            similarities[np.arange(column_start, column_stop) <= block_ids] = -np.inf
+        rows, cols = np.nonzero(similarities >= threshold)
+        if not len(rows):
+            continue
+        found_rows.append(rows + start)
+        found_cols.append(cols + column_start)
+        found_scores.append(similarities[rows, cols])
+        pending += len(rows)
+        # A low threshold can match a lot; keep the candidates bounded by top_m
+        if pending > 4 * top_m * len(block):
+            found_rows, found_cols, found_scores = (
+                [part] for part in _top_per_row(
+                    np.concatenate(found_rows), np.concatenate(found_cols), np.concatenate(found_scores), top_m
+                )
+            )
+            pending = len(found_rows[0])
+
+    if not found_rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return _top_per_row(np.concatenate(found_rows), np.concatenate(found_cols), np.concatenate(found_scores), top_m)
+
+
+def _init_worker(path):
+    global _worker_matrix
+    _worker_matrix = np.load(path, mmap_mode='r')
+
+
+def _scan_worker(task):
+    start, stop, threshold, top_m, column_block = task
+    return stop - start, scan_rows(_worker_matrix, start, stop, threshold, top_m, column_block)
+
+
+def iter_duplicates(matrix, threshold, top_m, block_rows=1024, column_block=4096, processes=1):
+    """Scan ``matrix`` block by block, yielding ``(rows_scanned, (rows, cols, scores))`` as blocks finish.
+
+    With ``processes > 1`` blocks are scanned in a process pool and may
+    finish out of order.
+    """
+    tasks = [
+        (start, min(start + block_rows, len(matrix)), threshold, top_m, column_block)
+        for start in range(0, len(matrix), block_rows)
+    ]
+    if processes <= 1:
+        for start, stop, *_ in tasks:
+            yield stop - start, scan_rows(matrix, start, stop, threshold, top_m, column_block)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'matrix.npy')
+        np.save(path, np.asarray(matrix, dtype=np.float32))
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(path,)) as pool:
+            # Early blocks have the most columns to their right; unordered keeps every worker busy
+            yield from pool.imap_unordered(_scan_worker, tasks)
@@ -0,0 +1,216 @@
+"""Embedding providers shared by the API, the data pipeline and the benchmarks.
+
+This module only needs NumPy, so the standalone scripts at the repository
+root can import it without configuring Django.
+"""
+import asyncio
+import functools
+import hashlib
+import importlib
+import os
+
+import numpy as np
+
+DEFAULT_MODEL = 'text-embedding-3-small'
+DEFAULT_DIMENSIONS = 1536
+
+
+def text_hash(text):
+    """Stable content hash of ``text``, insensitive to surrounding and repeated whitespace."""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+class EmbeddingError(Exception):
+    """The embedding backend failed, timed out or rejected the request."""
+
+
+class EmbeddingProvider:
+    """Turns text into float32 vectors.
+
+    Subclasses implement ``embed``, which takes a list of strings and returns
+    an ``(len(texts), dimensions)`` array. ``model`` identifies the vector
+    space and is part of every cache key.
+    """
+
+    model = ''
+    dimensions = DEFAULT_DIMENSIONS
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+    async def aembed(self, texts):
+        """Async ``embed``; runs the sync implementation in a thread unless overridden."""
+        return await asyncio.to_thread(self.embed, list(texts))
+
+    async def aembed_one(self, text):
+        return (await self.aembed([text]))[0]
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API, with request batching, timeouts and retries."""
+
+    def __init__(self, model=DEFAULT_MODEL, dimensions=DEFAULT_DIMENSIONS, timeout=10.0,
+                 max_retries=2, batch_size=256, api_key=None, base_url=None):
+        self.model = model
+        self.dimensions = dimensions
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._async_client = None
+
+    def _client_options(self):
+        return {
+            'api_key': self.api_key,
+            'base_url': self.base_url,
+            'timeout': self.timeout,
+            'max_retries': self.max_retries,
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI(**self._client_options())
+        return self._async_client
+
+    def embed(self, texts):
+        from openai import OpenAIError
+
+        texts = list(texts)
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            try:
+                response = self.client.embeddings.create(
+                    input=texts[start:start + self.batch_size],
+                    model=self.model
+                )
+            except OpenAIError as e:
+                raise EmbeddingError(f'OpenAI embeddings request failed: {e}') from e
+            for item in response.data:
+                vectors[start + item.index] = item.embedding
+        return vectors
+
+    async def aembed(self, texts):
+        from openai import OpenAIError
+
+        texts = list(texts)
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            try:
+                response = await self.async_client.embeddings.create(
+                    input=texts[start:start + self.batch_size],
+                    model=self.model
+                )
+            except OpenAIError as e:
+                raise EmbeddingError(f'OpenAI embeddings request failed: {e}') from e
+            for item in response.data:
+                vectors[start + item.index] = item.embedding
+        return vectors
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Deterministic offline embeddings from hashed word and character n-grams.
+
+    Each n-gram is hashed to a signed coordinate of the output vector, so
+    texts sharing words or word fragments end up close in cosine space. It
+    is no substitute for a trained model, but it needs no network or API key
+    and is stable across processes and machines.
+    """
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, ngram_range=(3, 5), model=None):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.model = model or f'local-hashed-ngrams-{dimensions}'
+
+    def _features(self, text):
+        words = text.lower().split()
+        yield from words
+        low, high = self.ngram_range
+        for word in words:
+            padded = f' {word} '
+            for n in range(low, high + 1):
+                for start in range(len(padded) - n + 1):
+                    yield padded[start:start + n]
+
+    def embed(self, texts):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimensions] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+PROVIDERS = {
+    'openai': 'questions.embeddings.OpenAIEmbeddingProvider',
+    'local': 'questions.embeddings.LocalEmbeddingProvider',
+}
+
+
+def config_from_env():
+    """Provider configuration from environment variables, for use outside Django."""
+    return {
+        'BACKEND': os.getenv('EMBEDDING_BACKEND', 'openai'),
+        'MODEL': os.getenv('EMBEDDING_MODEL', DEFAULT_MODEL),
+        'DIMENSIONS': int(os.getenv('EMBEDDING_DIMENSIONS', DEFAULT_DIMENSIONS)),
+        'TIMEOUT': float(os.getenv('EMBEDDING_TIMEOUT', '10')),
+        'MAX_RETRIES': int(os.getenv('EMBEDDING_MAX_RETRIES', '2')),
+        'BATCH_SIZE': int(os.getenv('EMBEDDING_BATCH_SIZE', '256')),
+        'BASE_URL': os.getenv('EMBEDDING_BASE_URL') or None,
+    }
+
+
+def _load_config():
+    try:
+        from django.conf import settings
+    except ImportError:
+        return config_from_env()
+    if settings.configured:
+        return settings.EMBEDDINGS
+    return config_from_env()
+
+
+def create_provider(config):
+    """Build a provider from a settings-style ``EMBEDDINGS`` dict."""
+    backend = config.get('BACKEND', 'openai')
+    module_name, _, class_name = PROVIDERS.get(backend, backend).rpartition('.')
+    provider_class = getattr(importlib.import_module(module_name), class_name)
+    dimensions = config.get('DIMENSIONS', DEFAULT_DIMENSIONS)
+
+    if provider_class is LocalEmbeddingProvider:
+        return provider_class(dimensions=dimensions)
+    if provider_class is OpenAIEmbeddingProvider:
+        return provider_class(
+            model=config.get('MODEL', DEFAULT_MODEL),
+            dimensions=dimensions,
+            timeout=config.get('TIMEOUT', 10.0),
+            max_retries=config.get('MAX_RETRIES', 2),
+            batch_size=config.get('BATCH_SIZE', 256),
+            base_url=config.get('BASE_URL'),
+        )
+    return provider_class(**config.get('OPTIONS', {}))
+
+
+@functools.cache
+def get_embedding_provider():
+    """The process-wide provider selected by ``settings.EMBEDDINGS``."""
+    return create_provider(_load_config())
@@ -0,0 +1,158 @@
+"""Typo-tolerant answer matching.
+
+Grading only needs to know whether two strings are within a small edit
+distance, so the matchers here stop as soon as the answer is decided
+instead of filling the whole Levenshtein table.
+"""
+
+# With Python ints as bit vectors each Myers step costs O(len / 30) digit
+# operations, so past roughly a thousand characters the O(len * k) banded DP
+# wins again (see benchmarks/fuzzy.py).
+BANDED_MIN_LENGTH = 1000
+
+
+def levenshtein_distance(a: str, b: str) -> int:
+    """Calculate the Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        return levenshtein_distance(b, a)
+
+    if len(b) == 0:
+        return len(a)
+
+    previous_row = range(len(b) + 1)
+    for i, c1 in enumerate(a):
+        current_row = [i + 1]
+        for j, c2 in enumerate(b):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+def banded_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance if it is at most ``max_distance``, else ``max_distance + 1``.
+
+    Only cells within ``max_distance`` of the diagonal can hold a value in
+    range, so each row is limited to that band, and the scan stops once a
+    whole band exceeds the threshold.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    n, m = len(a), len(b)
+    k = max_distance
+    if n - m > k:
+        return k + 1
+    if m == 0:
+        return min(n, k + 1)
+
+    # Rows only store the 2k+1 diagonals around the main one; index
+    # ``d + k`` holds column ``j = i + d``.
+    over = k + 1
+    width = 2 * k + 1
+    previous = [d - k if 0 <= d - k <= min(m, k) else over for d in range(width)]
+    for i in range(1, n + 1):
+        c1 = a[i - 1]
+        current = [over] * width
+        row_min = over
+        for index in range(width):
+            j = i + index - k
+            if j < 0 or j > m:
+                continue
+            if j == 0:
+                value = i if i <= k else over
+            else:
+                value = previous[index] + (c1 != b[j - 1])
+                if index + 1 < width and previous[index + 1] + 1 < value:
+                    value = previous[index + 1] + 1
+                if index > 0 and current[index - 1] + 1 < value:
+                    value = current[index - 1] + 1
+                if value > over:
+                    value = over
+            current[index] = value
+            if value < row_min:
+                row_min = value
+        if row_min > k:
+            return over
+        previous = current
+    return previous[m - n + k]
+
+
+def bit_parallel_distance(a: str, b: str, max_distance: int | None = None) -> int:
+    """Myers/Hyyrö bit-vector Levenshtein distance.
+
+    The DP column for ``a`` is held in two bit vectors (Python ints), so
+    each character of ``b`` costs a handful of integer operations instead
+    of ``len(a)`` cell updates. With ``max_distance`` the scan stops early
+    and returns ``max_distance + 1`` once the threshold cannot be met.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if max_distance is not None and len(a) - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return len(a)
+
+    # Pattern is the shorter string; the longer one is scanned.
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    remaining = len(a)
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        remaining -= 1
+        # The score can drop by at most one per remaining character.
+        if max_distance is not None and score - remaining > max_distance:
+            return max_distance + 1
+    return score
+
+
+def within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Whether the Levenshtein distance between ``a`` and ``b`` is at most ``max_distance``."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    if max(len(a), len(b)) >= BANDED_MIN_LENGTH:
+        return banded_distance(a, b, max_distance) <= max_distance
+    return bit_parallel_distance(a, b, max_distance) <= max_distance
+
+
+def is_answer_correct(user_answer: str, correct_answer: str, max_distance: int = 2) -> bool:
+    """Check if answer is correct, allowing for minor typos."""
+    normalized_user = user_answer.strip().lower()
+    normalized_correct = correct_answer.strip().lower()
+
+    if normalized_user == normalized_correct:
+        return True
+
+    if len(normalized_user) == 0:
+        return False
+
+    return within_distance(normalized_user, normalized_correct, max_distance)
+
+
+def grade_answers(pairs, max_distance: int = 2) -> list[bool]:
+    """Grade a whole submission of ``(user_answer, correct_answer)`` pairs."""
+    return [is_answer_correct(user_answer, correct_answer, max_distance) for user_answer, correct_answer in pairs]
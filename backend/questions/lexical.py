@@ -0,0 +1,185 @@
+"""In-memory BM25 keyword search over question text and answers.
+
+Semantic ranking needs an embedding of the query, so it depends on the
+embeddings service. This index needs nothing but the question table: it
+answers keyword queries in a few milliseconds and is what the ranking views
+fall back to when the embeddings backend fails.
+
+Postings are stored compressed-sparse-row style: the rows containing term
+``t`` are ``rows[offsets[t]:offsets[t + 1]]``, with the BM25 weight of each
+posting precomputed in ``weights``, so scoring a query is one vectorized add
+per query term. The index follows ``CorpusVersion`` on its own, so keyword
+searches never build the embedding matrix.
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .metrics import phase
+from .models import CorpusVersion, Question
+from .ranking import top_k
+
+# Standard BM25 parameters: term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has he in is it its of on or that the this to was were what which who '
+    'whom whose why when where how with'.split()
+)
+
+
+def tokenize(text):
+    """Lowercased word tokens of ``text`` without stop words."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class _Postings:
+    """Immutable BM25 index over one version of the question set."""
+
+    __slots__ = ('ids', 'terms', 'offsets', 'rows', 'weights')
+
+    def __init__(self, ids, documents):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.terms = {}
+        term_ids = []
+        rows = []
+        counts = []
+        lengths = np.empty(len(documents), dtype=np.float32)
+        for row, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                term_ids.append(self.terms.setdefault(term, len(self.terms)))
+                rows.append(row)
+                counts.append(count)
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        self.rows = np.asarray(rows, dtype=np.int32)[order]
+        frequencies = np.asarray(counts, dtype=np.float32)[order]
+        document_frequency = np.bincount(term_ids, minlength=len(self.terms))
+        self.offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.offsets[1:])
+
+        count = len(documents)
+        average_length = lengths.mean() if count and lengths.any() else 1.0
+        idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        norm = K1 * (1 - B + B * lengths[self.rows] / average_length)
+        self.weights = np.repeat(idf, document_frequency) * frequencies * (K1 + 1) / (frequencies + norm)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.offsets.nbytes + self.rows.nbytes + self.weights.nbytes
+
+    def search(self, query, limit, exclude=None):
+        """Return ``(ids, scores)`` of the ``limit`` best matches for ``query``; only rows matching a term.
+
+        Ids in the sorted array ``exclude`` are never returned.
+        """
+        term_ids = {self.terms[token] for token in tokenize(query) if token in self.terms}
+        if not term_ids or limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in term_ids:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # A row appears at most once per term, so plain fancy-index add is safe
+            scores[self.rows[start:end]] += self.weights[start:end]
+        if exclude is not None and len(exclude) and len(self.ids):
+            # ids are in id order, so the excluded rows are a searchsorted away
+            rows = np.minimum(np.searchsorted(self.ids, exclude), len(self.ids) - 1)
+            scores[rows[self.ids[rows] == exclude]] = 0
+        matched = np.flatnonzero(scores)
+        top = matched[top_k(scores[matched], limit)]
+        return self.ids[top], scores[top]
+
+
+class LexicalIndex:
+    """Process-wide BM25 index, rebuilt when the question set changes.
+
+    Like ``RankingIndex`` it polls ``CorpusVersion`` every
+    ``SNAPSHOT_POLL_INTERVAL`` seconds, and right away after a change made
+    by this process (see ``changed()``). Only a cold index is built under
+    the lock. After a change, one request re-tokenizes the corpus without
+    holding it and swaps the new postings in; meanwhile every other request
+    keeps searching the old ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._version = None
+        self._checked_at = 0.0
+        self._building = False
+
+    @staticmethod
+    def _build():
+        rows = Question.objects.order_by('id').values_list('id', 'question_text', 'answer')
+        ids = []
+        documents = []
+        for question_id, question_text, answer in rows.iterator():
+            ids.append(question_id)
+            documents.append(f'{question_text} {answer}')
+        return _Postings(ids, documents)
+
+    def postings(self):
+        postings = self._postings
+        if postings is None:
+            with phase('lexical_index'), self._lock:
+                if self._postings is None:
+                    # Read before the rows: a change made meanwhile is rebuilt again later
+                    self._version = CorpusVersion.current()
+                    self._postings = self._build()
+                    self._checked_at = time.monotonic()
+                return self._postings
+        if time.monotonic() - self._checked_at < settings.RANKING['SNAPSHOT_POLL_INTERVAL']:
+            return postings
+
+        with self._lock:
+            if self._building or time.monotonic() - self._checked_at < settings.RANKING['SNAPSHOT_POLL_INTERVAL']:
+                return self._postings or postings
+            self._checked_at = time.monotonic()
+            version = CorpusVersion.current()
+            if version == self._version:
+                return postings
+            self._building = True
+        try:
+            with phase('lexical_index'):
+                postings = self._build()
+            with self._lock:
+                self._version, self._postings = version, postings
+            return postings
+        finally:
+            self._building = False
+
+    def changed(self):
+        """Check ``CorpusVersion`` on the next search instead of waiting for the poll interval."""
+        self._checked_at = 0.0
+
+    def search(self, query, limit, exclude=None):
+        """Return ``(ids, scores)`` of the ``limit`` questions that best match ``query``'s keywords."""
+        postings = self.postings()
+        with phase('lexical'):
+            return postings.search(query, limit, exclude)
+
+    def memory_usage(self):
+        postings = self.postings()
+        return {'postings': postings.nbytes, 'terms': len(postings.terms)}
+
+    def invalidate(self):
+        with self._lock:
+            self._postings = None
+            self._version = None
+
+
+lexical_index = LexicalIndex()
+
+
+def lexical_rank_ids(query, limit, exclude=None):
+    """Ids of the ``limit`` questions matching ``query``'s keywords best, best first, none of them in ``exclude``."""
+    return lexical_index.search(query, limit, exclude)[0].tolist()
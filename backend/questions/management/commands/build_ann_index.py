@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from questions import ann
+from questions.ranking import ranking_index
+
+
+class Command(BaseCommand):
+    help = 'Train the IVF approximate nearest-neighbour index over the question embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nlist', type=int, help='Number of k-means cells (default: 4 * sqrt(N))')
+        parser.add_argument('--iterations', type=int, default=20, help='k-means iterations')
+        parser.add_argument('--sample-size', type=int, help='Rows used to train the centroids (default: 64 per cell)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        ids, matrix = ranking_index.read_matrix()
+        if len(ids) == 0:
+            raise CommandError('There are no questions to index')
+
+        nlist = options['nlist'] or ann.default_nlist(len(ids))
+        self.stdout.write(f'Training {nlist} cells over {len(ids)} questions...')
+        started = time.perf_counter()
+        centroids = ann.train_centroids(
+            matrix,
+            nlist,
+            iterations=options['iterations'],
+            sample_size=options['sample_size'],
+            seed=options['seed'],
+        )
+        labels = ann.assign(matrix, centroids)
+        path = settings.RANKING['IVF_PATH']
+        ann.save(path, centroids, ids, labels)
+
+        # Pick up the new cells on the next search in this process
+        ranking_index.invalidate()
+
+        sizes = ann.InvertedLists(labels, len(centroids)).offsets
+        sizes = sizes[1:] - sizes[:-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {path} in {time.perf_counter() - started:.1f}s '
+            f'(cell sizes: min {sizes.min()}, mean {sizes.mean():.0f}, max {sizes.max()})'
+        ))
+        if settings.RANKING['BACKEND'] != 'ivf':
+            self.stdout.write("Set RANKING_BACKEND=ivf to search with this index.")
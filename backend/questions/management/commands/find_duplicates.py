@@ -0,0 +1,123 @@
+import csv
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from questions import counters, duplicates
+from questions.models import Question, QuestionReport
+from questions.ranking import ranking_index
+
+
+class Command(BaseCommand):
+    help = 'Find near-duplicate questions by embedding similarity, block by block'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=0.95, help='Minimum cosine similarity of a pair')
+        parser.add_argument('--top', type=int, default=5, help='Most near-duplicates kept per question')
+        parser.add_argument('--block-size', type=int, default=1024, help='Rows compared per block')
+        parser.add_argument('--column-block', type=int, default=4096, help='Columns per similarity tile')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes scanning blocks')
+        parser.add_argument('--output', default='near_duplicates.csv', help='CSV report of the pairs found')
+        parser.add_argument(
+            '--report-as',
+            metavar='USERNAME',
+            help="Also file a 'repeated' report on the newer question of each pair, by this user, for the admin",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be in (0, 1]')
+        if options['top'] < 1 or options['block_size'] < 1 or options['column_block'] < 1:
+            raise CommandError('--top, --block-size and --column-block must be positive')
+
+        reporter = None
+        if options['report_as']:
+            try:
+                reporter = User.objects.get(username=options['report_as'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['report_as']!r} does not exist")
+
+        ids, matrix = ranking_index.read_matrix()
+        if len(ids) == 0:
+            raise CommandError('There are no questions to scan')
+
+        self.stdout.write(
+            f"Scanning {len(ids)} questions for pairs with similarity >= {options['threshold']} "
+            f"using {options['processes']} process(es)..."
+        )
+        started = time.perf_counter()
+        scanned = 0
+        pairs = 0
+        reported = 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['question_id', 'duplicate_id', 'similarity', 'question', 'duplicate'])
+            blocks = duplicates.iter_duplicates(
+                matrix,
+                options['threshold'],
+                options['top'],
+                block_rows=options['block_size'],
+                column_block=options['column_block'],
+                processes=options['processes'],
+            )
+            for rows_scanned, (rows, cols, scores) in blocks:
+                scanned += rows_scanned
+                if len(rows):
+                    found = list(zip(ids[rows].tolist(), ids[cols].tolist(), scores.tolist()))
+                    self.write_pairs(writer, found)
+                    f.flush()
+                    pairs += len(found)
+                    if reporter is not None:
+                        reported += self.report_pairs(reporter, found)
+                self.stdout.write(f'  {scanned}/{len(ids)} questions scanned, {pairs} pairs', ending='\r')
+                self.stdout.flush()
+
+        self.stdout.write('')
+        message = f"Found {pairs} near-duplicate pairs in {time.perf_counter() - started:.1f}s; wrote {options['output']}"
+        if reporter is not None:
+            message += f'; filed {reported} new reports'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def write_pairs(self, writer, pairs):
+        texts = Question.objects.only('question_text').in_bulk({i for pair in pairs for i in pair[:2]})
+        for question_id, duplicate_id, similarity in pairs:
+            question = texts.get(question_id)
+            duplicate = texts.get(duplicate_id)
+            writer.writerow([
+                question_id,
+                duplicate_id,
+                f'{similarity:.4f}',
+                question.question_text if question else '',
+                duplicate.question_text if duplicate else '',
+            ])
+
+    def report_pairs(self, reporter, pairs):
+        """File one open 'repeated' report per newer question not already reported by ``reporter``."""
+        originals = {}
+        for question_id, duplicate_id, similarity in pairs:
+            original, newer = sorted((question_id, duplicate_id))
+            if newer not in originals or similarity > originals[newer][1]:
+                originals[newer] = (original, similarity)
+
+        already = set(
+            QuestionReport.objects
+            .filter(user=reporter, report_type='repeated', resolved=False, question_id__in=list(originals))
+            .values_list('question_id', flat=True)
+        )
+        existing = set(Question.objects.filter(id__in=list(originals)).values_list('id', flat=True))
+        reports = [
+            QuestionReport(
+                user=reporter,
+                question_id=newer,
+                report_type='repeated',
+                description=f'Near-duplicate of question #{original} (similarity {similarity:.3f})',
+            )
+            for newer, (original, similarity) in originals.items()
+            if newer not in already and newer in existing
+        ]
+        if reports:
+            with transaction.atomic():
+                QuestionReport.objects.bulk_create(reports)
+                counters.recount([report.question_id for report in reports], fields=['open_report_count'])
+        return len(reports)
@@ -1,27 +1,181 @@
 from django.core.management.base import BaseCommand
-from questions.models import Question
+from django.db import transaction
+from django.db.models import Max
+from questions.embeddings import get_embedding_provider, text_hash
+from questions.models import Question, encode_embedding
+from questions.ranking import ranking_index
+from django.conf import settings
 import json
 import os
+import time
+
+CHUNK_SIZE = 1 << 20
+# Questions deleted per statement by --prune, well under SQLite's bound-variable limit
+PRUNE_BATCH_SIZE = 500
+
+
+def iter_json_array(f):
+    """Yield the items of a top-level JSON array without reading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started:
+                if position == len(buffer):
+                    break
+                if buffer[position] != '[':
+                    raise ValueError('Expected a JSON array of questions')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The item continues in the next chunk
+                break
+            yield item
+
+        if not chunk:
+            if buffer[position:].strip():
+                raise ValueError('Unexpected end of JSON array')
+            return
+
+
+def iter_questions(path):
+    """Yield question dicts from a JSON array or a JSON Lines file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
 
 class Command(BaseCommand):
     help = 'Load questions from JSON file'
 
-    def handle(self, *args, **kwargs):
-        from django.conf import settings
-        json_path = os.path.join(settings.BASE_DIR, 'questions', 'questions_embeddings.json')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='JSON array or JSON Lines file (default: questions/questions_embeddings.jsonl, '
+                 'falling back to questions/questions_embeddings.json)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction')
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete questions that are not in the file. This also deletes their answers and reports.',
+        )
+
+    def handle(self, *args, **options):
+        json_path = options['path'] or self.default_path()
+        batch_size = options['batch_size']
+
+        self.stdout.write(f'Loading questions from {json_path}...')
+
+        self.created = 0
+        self.updated = 0
+        # Every row this run writes is stamped with it, so --prune needs no list of ids
+        self.generation = (Question.objects.aggregate(last=Max('load_generation'))['last'] or 0) + 1
+        started = time.perf_counter()
+
+        batch = []
+        for item in iter_questions(json_path):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.write_batch(batch)
+                batch = []
+                self.report_progress(started)
+        if batch:
+            self.write_batch(batch)
+
+        pruned = self.prune() if options['prune'] else 0
+
+        # bulk_create/bulk_update bypass the model signals
+        ranking_index.invalidate()
+
+        elapsed = time.perf_counter() - started
+        total = self.created + self.updated
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully loaded {total} questions '
+            f'({self.created} created, {self.updated} updated, {pruned} pruned) '
+            f'in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+
+    def default_path(self):
+        base = os.path.join(settings.BASE_DIR, 'questions', 'questions_embeddings')
+        if os.path.exists(base + '.jsonl'):
+            return base + '.jsonl'
+        return base + '.json'
+
+    def report_progress(self, started):
+        total = self.created + self.updated
+        rate = total / (time.perf_counter() - started)
+        self.stdout.write(f'  {total} questions ({self.created} created, {self.updated} updated, {rate:.0f} rows/s)')
+
+    def prune(self):
+        """Delete the questions this run did not write, a batch at a time, and return how many."""
+        stale = Question.objects.exclude(load_generation=self.generation).order_by('id').values_list('id', flat=True)
+        pruned = 0
+        while True:
+            ids = list(stale[:PRUNE_BATCH_SIZE])
+            if not ids:
+                return pruned
+            with transaction.atomic():
+                _, deleted = Question.objects.filter(id__in=ids).delete()
+            pruned += deleted.get('questions.Question', 0)
+
+    def write_batch(self, items):
+        """Upsert ``items`` by content key in one transaction."""
+        # Items without a precomputed vector are embedded with the configured
+        # provider, so a plain question list can be loaded offline.
+        missing = [item for item in items if 'embedding' not in item]
+        if missing:
+            vectors = get_embedding_provider().embed([item['question'] for item in missing])
+            for item, vector in zip(missing, vectors):
+                item['embedding'] = vector
 
-        self.stdout.write('Loading questions...')
+        by_key = {}
+        for item in items:
+            by_key[text_hash(item['question'])] = item
 
-        with open(json_path, 'r') as f:
-            questions_data = json.load(f)
+        dtype = settings.EMBEDDING_STORAGE_DTYPE
+        with transaction.atomic():
+            existing = {}
+            for question in Question.objects.filter(content_key__in=list(by_key)).only('id', 'content_key'):
+                existing.setdefault(question.content_key, question)
 
-        Question.objects.all().delete()
+            to_create = []
+            to_update = []
+            for key, item in by_key.items():
+                question = existing.get(key)
+                if question is None:
+                    question = Question(content_key=key)
+                    to_create.append(question)
+                else:
+                    to_update.append(question)
+                question.question_text = item['question']
+                question.answer = item['answer']
+                question.embedding = encode_embedding(item['embedding'], dtype)
+                question.embedding_dtype = dtype
+                question.load_generation = self.generation
 
-        for item in questions_data:
-            Question.objects.create(
-                question_text=item['question'],
-                answer=item['answer'],
-                embedding=item['embedding']
+            Question.objects.bulk_create(to_create)
+            Question.objects.bulk_update(
+                to_update, ['question_text', 'answer', 'embedding', 'embedding_dtype', 'load_generation']
             )
 
-        self.stdout.write(self.style.SUCCESS(f'Successfully loaded {len(questions_data)} questions'))
+        self.created += len(to_create)
+        self.updated += len(to_update)
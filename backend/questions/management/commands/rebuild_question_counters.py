@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from questions import counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the denormalized per-question answer and report counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report questions whose counters disagree with the raw rows; exit non-zero if any do',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            wrong = list(counters.mismatches()[:50])
+            for row in wrong:
+                self.stdout.write(
+                    f"Question {row['id']}: "
+                    f"answered {row['times_answered']} (expected {row['expected_times_answered']}), "
+                    f"correct {row['correct_count']} (expected {row['expected_correct_count']}), "
+                    f"open reports {row['open_report_count']} (expected {row['expected_open_report_count']})"
+                )
+            if wrong:
+                total = counters.mismatches().count()
+                raise CommandError(f'{total} questions have stale counters; run without --verify to rebuild them')
+            self.stdout.write(self.style.SUCCESS('All question counters match the raw rows'))
+            return
+
+        updated = counters.recount()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} questions'))
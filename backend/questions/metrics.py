@@ -0,0 +1,197 @@
+"""Per-request phase timing and Prometheus-style latency histograms.
+
+``MetricsMiddleware`` starts a ``RequestTimer`` for every request. Code on
+the hot paths wraps its stages in ``phase('name')``, and every database
+query is counted and timed through an execute wrapper. When the response
+leaves, the timings go out in a ``Server-Timing`` header and into the
+process-wide histograms served by the ``/metrics`` endpoint.
+
+Metrics are kept per process; with several workers, scrape each one or
+aggregate at the proxy.
+"""
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+current_timer = contextvars.ContextVar('current_timer', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Thread-safe labelled histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_DURATION = Histogram(
+    'question_ranker_request_duration_seconds',
+    'Time spent handling a request, by view and status code.',
+    ('view', 'status'),
+)
+PHASE_DURATION = Histogram(
+    'question_ranker_phase_duration_seconds',
+    'Time spent in each stage of a request, by view and phase. Phases may overlap "db".',
+    ('view', 'phase'),
+)
+REQUEST_QUERIES = Histogram(
+    'question_ranker_request_queries',
+    'Database queries issued per request, by view.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_DURATION, PHASE_DURATION, REQUEST_QUERIES]
+
+
+class RequestTimer:
+    """Accumulated phase durations and query count of one request."""
+
+    __slots__ = ('started', 'phases', 'queries', 'view')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.view = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.phases.items()]
+        if 'db' in self.phases:
+            entries[list(self.phases).index('db')] += f';desc="{self.queries} queries"'
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time the enclosed block as ``name`` in the current request, if there is one."""
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Database execute wrapper that charges every query to the current request."""
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.queries += 1
+        timer.add('db', time.perf_counter() - started)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``count_queries`` to each new connection."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+class MetricsMiddleware:
+    """Times every request, adds a ``Server-Timing`` header and feeds the histograms."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer)
+
+    async def __acall__(self, request):
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = current_timer.get()
+        if timer is not None:
+            timer.view = request.resolver_match.view_name or request.resolver_match.route
+
+    def finish(self, request, response, timer):
+        total = time.perf_counter() - timer.started
+        view = timer.view or 'unmatched'
+        REQUEST_DURATION.observe((view, str(response.status_code)), total)
+        REQUEST_QUERIES.observe((view,), timer.queries)
+        for name, seconds in timer.phases.items():
+            PHASE_DURATION.observe((view, name), seconds)
+        response['Server-Timing'] = timer.server_timing(total)
+        return response
+
+
+def render(extra_lines=()):
+    """All histograms plus ``extra_lines``, as a Prometheus text exposition."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,72 @@
+import numpy as np
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def json_to_blob(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    batch = []
+    for question in Question.objects.only('id', 'embedding').iterator(chunk_size=BATCH_SIZE):
+        question.embedding_blob = np.asarray(question.embedding, dtype='<f4').tobytes()
+        question.embedding_dtype = 'float32'
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            Question.objects.bulk_update(batch, ['embedding_blob', 'embedding_dtype'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['embedding_blob', 'embedding_dtype'])
+
+
+def blob_to_json(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    batch = []
+    for question in Question.objects.only('id', 'embedding_blob', 'embedding_dtype').iterator(chunk_size=BATCH_SIZE):
+        dtype = np.dtype(question.embedding_dtype).newbyteorder('<')
+        question.embedding = np.frombuffer(question.embedding_blob, dtype=dtype).astype(float).tolist()
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            Question.objects.bulk_update(batch, ['embedding'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['embedding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_questionreport'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='embedding',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='embedding_blob',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='embedding_dtype',
+            field=models.CharField(choices=[('float32', 'float32'), ('float16', 'float16')], default='float32', max_length=8),
+        ),
+        migrations.RunPython(json_to_blob, blob_to_json),
+        migrations.RemoveField(
+            model_name='question',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='question',
+            old_name='embedding_blob',
+            new_name='embedding',
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='embedding',
+            field=models.BinaryField(),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+from questions.embeddings import text_hash
+
+BATCH_SIZE = 1000
+
+
+def populate_content_key(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    batch = []
+    for question in Question.objects.only('id', 'question_text').iterator(chunk_size=BATCH_SIZE):
+        question.content_key = text_hash(question.question_text)
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            Question.objects.bulk_update(batch, ['content_key'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['content_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_queryembedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_content_key, migrations.RunPython.noop),
+    ]
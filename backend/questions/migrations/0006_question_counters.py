@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-17 01:28
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    Answer = apps.get_model('questions', 'Answer')
+    QuestionReport = apps.get_model('questions', 'QuestionReport')
+
+    def counted(queryset):
+        return Coalesce(
+            Subquery(
+                queryset
+                .filter(question=OuterRef('pk'))
+                .order_by()
+                .values('question')
+                .annotate(count=Count('id'))
+                .values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    Question.objects.update(
+        times_answered=counted(Answer.objects.all()),
+        correct_count=counted(Answer.objects.filter(is_correct=True)),
+        open_report_count=counted(QuestionReport.objects.filter(resolved=False)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_question_content_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='open_report_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='times_answered',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_question_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='gamesession',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='gamesession_user_recent_idx'),
+        ),
+    ]
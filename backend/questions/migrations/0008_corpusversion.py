@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+def create_row(apps, schema_editor):
+    apps.get_model('questions', 'CorpusVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0007_gamesession_user_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_row, migrations.RunPython.noop),
+    ]
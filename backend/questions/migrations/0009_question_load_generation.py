@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_corpusversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='load_generation',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -1,11 +1,38 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 import json
+import numpy as np
+
+from .embeddings import text_hash
+
+EMBEDDING_DTYPES = [
+    ('float32', 'float32'),
+    ('float16', 'float16'),
+]
+
+
+def encode_embedding(values, dtype=None):
+    """Pack an embedding into the raw little-endian bytes stored on Question."""
+    dtype = np.dtype(dtype or settings.EMBEDDING_STORAGE_DTYPE).newbyteorder('<')
+    return np.asarray(values, dtype=dtype).tobytes()
+
 
 class Question(models.Model):
     question_text = models.TextField()
     answer = models.TextField()
-    embedding = models.JSONField()
+    embedding = models.BinaryField()
+    embedding_dtype = models.CharField(max_length=8, choices=EMBEDDING_DTYPES, default='float32')
+    # Stable identity used by load_questions to upsert without changing ids
+    content_key = models.CharField(max_length=64, db_index=True, editable=False)
+    # The load_questions run that last wrote this row; --prune deletes rows of older runs
+    load_generation = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    # Denormalized counters, maintained by questions.counters
+    times_answered = models.PositiveIntegerField(default=0, editable=False)
+    correct_count = models.PositiveIntegerField(default=0, editable=False)
+    open_report_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('times_answered', 'correct_count', 'open_report_count')
 
     class Meta:
         ordering = ['id']
@@ -13,6 +40,77 @@ class Question(models.Model):
     def __str__(self):
         return self.question_text
 
+    @property
+    def accuracy(self):
+        if self.times_answered == 0:
+            return None
+        return (self.correct_count / self.times_answered) * 100
+
+    def save(self, *args, **kwargs):
+        self.content_key = text_hash(self.question_text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'question_text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_key'}
+        elif update_fields is None and self.pk is not None and not self._state.adding:
+            # Never write back counters that may have moved since this
+            # instance was loaded; they are only changed with F() updates.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def vector(self):
+        """The embedding as a read-only NumPy array backed by the stored bytes."""
+        return np.frombuffer(self.embedding, dtype=np.dtype(self.embedding_dtype).newbyteorder('<'))
+
+    def set_embedding(self, values, dtype=None):
+        dtype = dtype or settings.EMBEDDING_STORAGE_DTYPE
+        self.embedding = encode_embedding(values, dtype)
+        self.embedding_dtype = dtype
+
+
+class QueryEmbedding(models.Model):
+    """Persistent tier of the query-embedding cache, shared by all workers."""
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    query = models.TextField()
+    embedding = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model}: {self.query[:50]}"
+
+    @property
+    def vector(self):
+        return np.frombuffer(self.embedding, dtype='<f4')
+
+
+class CorpusVersion(models.Model):
+    """Single-row counter bumped with every change to the question set.
+
+    Every worker polls it (see ``RankingIndex``), so a change made by any
+    process, including ``load_questions``, retires results cached for the
+    old question set everywhere.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        """Increment the version as part of the caller's transaction and return the new value."""
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(pk=1)
+            cls.objects.filter(pk=1).update(version=models.F('version') + 1)
+        return cls.current()
+
 
 class GameSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -22,7 +120,11 @@ class GameSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Serves a player's history newest first (see KeysetPagination)
+            models.Index(fields=['user', '-created_at', '-id'], name='gamesession_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.score}/{self.total_questions}"
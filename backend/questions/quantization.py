@@ -0,0 +1,123 @@
+"""Compressed first-pass representations of the embedding matrix.
+
+A compressed scan finds a few hundred candidates cheaply; the caller then
+re-ranks them with the exact float32 vectors. Two encodings are offered,
+both optionally over a Matryoshka-style prefix (the first ``dims``
+coordinates, renormalized), which text-embedding-3 models are trained to
+support:
+
+* ``int8``: per-dimension symmetric scalar quantization, 4x smaller.
+* ``binary``: one sign bit per dimension, 32x smaller, scored by Hamming
+  distance with ``np.bitwise_count``.
+"""
+import numpy as np
+
+SCORE_CHUNK_ROWS = 65536
+
+
+def _prefix(vectors, dims):
+    vectors = np.atleast_2d(vectors)[:, :dims]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class _Codes:
+    """Row-aligned codes for the rows of a ranking snapshot; immutable like the snapshot."""
+
+    def __init__(self, codes, dims):
+        self.codes = codes
+        self.dims = dims
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def encode_rows(self, vectors):
+        raise NotImplementedError
+
+    def score(self, query):
+        """Approximate similarity of ``query`` to every row; higher is closer."""
+        raise NotImplementedError
+
+    def _with_codes(self, codes):
+        raise NotImplementedError
+
+    def replaced(self, row, vector):
+        codes = self.codes.copy()
+        codes[row] = self.encode_rows(vector)[0]
+        return self._with_codes(codes)
+
+    def appended(self, vector):
+        return self._with_codes(np.concatenate([self.codes, self.encode_rows(vector)]))
+
+    def deleted(self, row):
+        return self._with_codes(np.delete(self.codes, row, axis=0))
+
+
+class Int8Codes(_Codes):
+    def __init__(self, codes, dims, scale):
+        super().__init__(codes, dims)
+        self.scale = scale
+
+    @classmethod
+    def encode(cls, matrix, dims):
+        prefix = _prefix(matrix, dims)
+        scale = np.abs(prefix).max(axis=0) / 127
+        scale[scale == 0] = 1
+        codes = cls(None, dims, scale.astype(np.float32))
+        codes.codes = codes.encode_rows(prefix)
+        return codes
+
+    def encode_rows(self, vectors):
+        # Scales are fixed when the snapshot is built; later rows are clipped
+        scaled = np.rint(_prefix(vectors, self.dims) / self.scale)
+        return np.clip(scaled, -127, 127).astype(np.int8)
+
+    def score(self, query):
+        query = (_prefix(query, self.dims)[0] * self.scale).astype(np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        # Widen in chunks so the float32 temporary stays small
+        for start in range(0, len(self.codes), SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + SCORE_CHUNK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def _with_codes(self, codes):
+        return Int8Codes(codes, self.dims, self.scale)
+
+
+class BinaryCodes(_Codes):
+    @classmethod
+    def encode(cls, matrix, dims):
+        codes = cls(None, dims)
+        codes.codes = codes.encode_rows(matrix)
+        return codes
+
+    def encode_rows(self, vectors):
+        bits = np.atleast_2d(vectors)[:, :self.dims] > 0
+        # Pad to whole 64-bit words so XOR/popcount run on uint64
+        words = -(-self.dims // 64)
+        packed = np.zeros((len(bits), words * 8), dtype=np.uint8)
+        packed[:, :-(-self.dims // 8)] = np.packbits(bits, axis=1)
+        return packed.view(np.uint64)
+
+    def score(self, query):
+        query = self.encode_rows(query)[0]
+        distance = np.bitwise_count(self.codes ^ query).sum(axis=1, dtype=np.int32)
+        return (self.dims - 2 * distance).astype(np.float32)
+
+    def _with_codes(self, codes):
+        return BinaryCodes(codes, self.dims)
+
+
+ENCODINGS = {
+    'int8': Int8Codes,
+    'binary': BinaryCodes,
+}
+
+
+def encode(matrix, mode, dims=None):
+    """Encode ``matrix`` with ``mode`` ('int8' or 'binary') over its first ``dims`` columns."""
+    dims = min(dims or matrix.shape[1], matrix.shape[1])
+    return ENCODINGS[mode].encode(matrix, dims)
@@ -0,0 +1,530 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from . import ann, quantization, snapshots
+from .metrics import phase
+from .models import CorpusVersion, Question
+
+RANKING_MODES = ('semantic', 'lexical', 'hybrid')
+
+# Reciprocal-rank fusion constant; 60 is the value from the original paper
+# and damps the influence of the very top ranks of any single list.
+RRF_K = 60
+
+
+def normalize(vector):
+    """Return ``vector`` as a unit-length float32 array."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+def top_k(scores, limit):
+    """Indices of the ``limit`` highest ``scores``, best first."""
+    count = len(scores)
+    limit = min(limit, count)
+    if limit <= 0:
+        return np.empty(0, dtype=np.int64)
+    if limit < count:
+        top = np.argpartition(scores, count - limit)[count - limit:]
+    else:
+        top = np.arange(count)
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def mmr(vectors, limit, diversity):
+    """Positions of ``limit`` rows of ``vectors`` picked by maximal marginal relevance.
+
+    Rows come best first and their relevance falls linearly with rank, so
+    the ranking works the same whatever produced it. Each pick maximizes
+    ``(1 - diversity) * relevance - diversity * (similarity to the closest
+    earlier pick)``; ``max_similarity`` is updated with one matrix-vector
+    product per pick.
+    """
+    count = len(vectors)
+    limit = min(limit, count)
+    diversity = np.float32(diversity)
+    gain = (1 - diversity) * (1 - np.arange(count, dtype=np.float32) / max(count, 1))
+    max_similarity = np.full(count, -1, dtype=np.float32)
+    scores = np.empty(count, dtype=np.float32)
+    picks = np.empty(limit, dtype=np.int64)
+    for step in range(limit):
+        np.multiply(max_similarity, diversity, out=scores)
+        np.subtract(gain, scores, out=scores)
+        pick = int(np.argmax(scores))
+        picks[step] = pick
+        gain[pick] = -np.inf
+        np.maximum(max_similarity, vectors @ vectors[pick], out=max_similarity)
+    return picks
+
+
+class _Snapshot:
+    """Immutable view of the index so readers never see a half-applied update."""
+
+    __slots__ = ('ids', 'matrix', 'positions', 'centroids', 'labels', 'codes', '_lists', '_order')
+
+    def __init__(self, ids, matrix, centroids=None, labels=None, codes=None, positions=None):
+        self.ids = ids
+        self.matrix = matrix
+        if positions is None:
+            positions = {int(question_id): row for row, question_id in enumerate(ids)}
+        self.positions = positions
+        self.centroids = centroids
+        self.labels = labels
+        self.codes = codes
+        self._lists = None
+        self._order = None
+
+    @property
+    def lists(self):
+        if self._lists is None:
+            self._lists = ann.InvertedLists(self.labels, len(self.centroids))
+        return self._lists
+
+    def rows_of(self, ids):
+        """Rows holding ``ids``, an int64 array; ids that are not indexed are skipped."""
+        if self._order is None:
+            self._order = np.argsort(self.ids, kind='stable')
+        found = np.minimum(np.searchsorted(self.ids, ids, sorter=self._order), len(self.ids) - 1)
+        rows = self._order[found]
+        return rows[self.ids[rows] == ids]
+
+
+class RankingIndex:
+    """Process-wide matrix of pre-normalized question embeddings.
+
+    Rows are unit-length float32 vectors, so cosine similarity against a
+    normalized query is a single matrix-vector product. The index is built
+    lazily on first use and kept fresh by the Question save/delete signals;
+    changes made by other processes are picked up through ``CorpusVersion``
+    (see below) by rebuilding the matrix.
+
+    With ``RANKING['BACKEND'] = 'ivf'`` and a trained index on disk (see the
+    ``build_ann_index`` command), corpora of at least
+    ``RANKING['EXACT_THRESHOLD']`` rows are searched approximately; every
+    row also carries its IVF cell, so new questions are searchable at once.
+
+    With ``RANKING['COMPRESSION']`` set to 'int8' or 'binary', the exact
+    scan runs over compressed (optionally ``PREFIX_DIMS``-truncated) codes
+    and only the best ``RERANK_CANDIDATES`` rows are re-scored with the
+    float32 vectors.
+
+    With ``RANKING['SHARED_SNAPSHOT']`` the matrix is not built per process:
+    every change publishes a new version under ``SNAPSHOT_DIR`` (see
+    ``questions.snapshots``) and all workers memory-map it read-only,
+    checking for a newer version every ``SNAPSHOT_POLL_INTERVAL`` seconds.
+
+    ``corpus_version()`` increases whenever the indexed question set may
+    have changed, so results cached under it never outlive the rows that
+    produced them. Every change also bumps the shared ``CorpusVersion`` row,
+    which each process polls every ``SNAPSHOT_POLL_INTERVAL`` seconds to
+    notice changes made elsewhere (other workers, ``load_questions``).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+        self._corpus_version = 0
+        self._database_version = None
+
+    def corpus_version(self):
+        self.snapshot()
+        return self._corpus_version
+
+    @staticmethod
+    def _shared():
+        return settings.RANKING['SHARED_SNAPSHOT']
+
+    def _read_database(self):
+        """Return ``(ids, matrix)`` of every question, rows normalized."""
+        rows = Question.objects.values_list('id', 'embedding', 'embedding_dtype')
+        ids = []
+        vectors = []
+        for question_id, embedding, dtype in rows.iterator():
+            ids.append(question_id)
+            vectors.append(np.frombuffer(embedding, dtype=np.dtype(dtype).newbyteorder('<')))
+
+        if not vectors:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+        matrix = np.empty((len(vectors), vectors[0].shape[0]), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            matrix[row] = vector
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        matrix /= norms
+        return np.asarray(ids, dtype=np.int64), matrix
+
+    def read_matrix(self):
+        """``(ids, matrix)`` of every question, read straight from the database.
+
+        For offline jobs: unlike ``invalidate()`` and ``snapshot()`` it does
+        not bump the shared version, publish, or replace the live index.
+        """
+        return self._read_database()
+
+    def _build(self):
+        return self._make_snapshot(*self._read_database())
+
+    def _make_snapshot(self, ids, matrix):
+        if not len(ids):
+            return _Snapshot(ids, matrix)
+        return _Snapshot(ids, matrix, *self._load_ivf(ids, matrix), codes=self._encode(matrix))
+
+    def _encode(self, matrix):
+        mode = settings.RANKING['COMPRESSION']
+        if mode == 'none':
+            return None
+        return quantization.encode(matrix, mode, settings.RANKING['PREFIX_DIMS'])
+
+    def _load_ivf(self, ids, matrix):
+        """Return ``(centroids, labels)`` for the current rows, or ``(None, None)``."""
+        if settings.RANKING['BACKEND'] != 'ivf':
+            return None, None
+        stored = ann.load(settings.RANKING['IVF_PATH'])
+        if stored is None:
+            return None, None
+        centroids, stored_ids, stored_labels = stored
+        if centroids.shape[1] != matrix.shape[1]:
+            return None, None
+
+        # Rows the index was trained on keep their cell; newer rows are assigned now
+        labels = np.full(len(ids), -1, dtype=np.int32)
+        order = np.argsort(stored_ids)
+        found = np.searchsorted(stored_ids, ids, sorter=order)
+        found = np.minimum(found, len(stored_ids) - 1)
+        known = stored_ids[order[found]] == ids
+        labels[known] = stored_labels[order[found[known]]]
+        if not known.all():
+            labels[~known] = ann.assign(matrix[~known], centroids)
+        return centroids, labels
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._checked_at >= settings.RANKING['SNAPSHOT_POLL_INTERVAL']:
+            with phase('index'), self._lock:
+                self._checked_at = time.monotonic()
+                self._sync_corpus_version()
+                if self._shared():
+                    self._sync_shared()
+                elif self._snapshot is None:
+                    self._snapshot = self._build()
+                snapshot = self._snapshot
+        return snapshot
+
+    def _sync_corpus_version(self):
+        """Follow changes other processes recorded in ``CorpusVersion``; caller holds the lock."""
+        version = CorpusVersion.current()
+        if version != self._database_version:
+            self._database_version = version
+            self._corpus_version += 1
+            if not self._shared():
+                # Their rows never reached our matrix; rebuild it from the database
+                self._snapshot = None
+
+    def _record_change(self):
+        """Bump the shared version so every process retires results for the old question set."""
+        version = CorpusVersion.bump()
+        with self._lock:
+            # Only our own bump: skip re-syncing it. Any gap means another process changed something too.
+            if self._database_version is not None and version == self._database_version + 1:
+                self._database_version = version
+
+    def _sync_shared(self):
+        """Swap to the live shared version if it changed; caller holds the lock."""
+        self._checked_at = time.monotonic()
+        directory = settings.RANKING['SNAPSHOT_DIR']
+        manifest = snapshots.read_manifest(directory)
+        if manifest is None:
+            # Workers starting together wait for whichever of them publishes first
+            self._publish_locked(initial=True)
+            return
+        if self._snapshot is not None and manifest['version'] == self._version:
+            return
+        try:
+            snapshot = self._make_snapshot(*snapshots.load(directory, manifest))
+        except FileNotFoundError:
+            # Pruned by a newer publish while we read the manifest; retry next call
+            self._checked_at = 0.0
+            if self._snapshot is None:
+                self._snapshot = self._build()
+            return
+        self._snapshot = snapshot
+        self._version = manifest['version']
+        self._corpus_version += 1
+
+    def _publish_locked(self, initial=False):
+        directory = settings.RANKING['SNAPSHOT_DIR']
+        manifest = snapshots.publish(directory, self._read_database, initial=initial)
+        self._snapshot = self._make_snapshot(*snapshots.load(directory, manifest))
+        self._version = manifest['version']
+        self._corpus_version += 1
+        self._checked_at = time.monotonic()
+
+    def publish(self):
+        """Rebuild from the database and make it the live shared snapshot for every worker."""
+        with self._lock:
+            self._publish_locked()
+
+    def _schedule_publish(self):
+        # One publish per transaction, after commit so the rebuild sees the change
+        connection = transaction.get_connection()
+        if any(entry[1] == self.publish for entry in connection.run_on_commit):
+            return
+        transaction.on_commit(self.publish)
+
+    def _bump(self):
+        with self._lock:
+            self._corpus_version += 1
+
+    def touch(self):
+        """Record a question change that leaves its vector as it is, such as an edited text."""
+        self._record_change()
+        self._bump()
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt from the database on next use.
+
+        With a shared snapshot the rebuild is published right away (after
+        the current transaction commits) so every worker picks it up.
+        """
+        self._record_change()
+        with self._lock:
+            self._corpus_version += 1
+            if not self._shared():
+                self._snapshot = None
+                return
+        self._schedule_publish()
+
+    def upsert(self, question_id, embedding):
+        self._record_change()
+        if self._shared():
+            self._bump()
+            self._schedule_publish()
+            return
+        with self._lock:
+            self._corpus_version += 1
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            vector = normalize(embedding)
+            if snapshot.matrix.size and vector.shape[0] != snapshot.matrix.shape[1]:
+                self._snapshot = None
+                return
+
+            labels = snapshot.labels
+            label = None
+            if labels is not None:
+                label = np.argmax(snapshot.centroids @ vector)
+            codes = snapshot.codes
+
+            positions = snapshot.positions
+            row = positions.get(question_id)
+            if row is not None:
+                # Rows readers can see are never written; re-embedding is rare, so copy
+                matrix = snapshot.matrix.copy()
+                matrix[row] = vector
+                ids = snapshot.ids
+                if labels is not None:
+                    labels = labels.copy()
+                    labels[row] = label
+                if codes is not None:
+                    codes = codes.replaced(row, vector)
+            elif snapshot.matrix.size:
+                ids, matrix = self._append_row(snapshot, question_id, vector)
+                positions = {**positions, question_id: len(snapshot.ids)}
+                if labels is not None:
+                    labels = np.append(labels, np.int32(label))
+                if codes is not None:
+                    codes = codes.appended(vector)
+            else:
+                matrix = vector[np.newaxis, :].copy()
+                ids = np.array([question_id], dtype=np.int64)
+                positions = None
+                codes = self._encode(matrix)
+            self._snapshot = _Snapshot(ids, matrix, snapshot.centroids, labels, codes, positions)
+
+    @staticmethod
+    def _append_row(snapshot, question_id, vector):
+        """``(ids, matrix)`` of ``snapshot`` plus one row; caller holds the lock.
+
+        The arrays are views of buffers with spare rows. A new row goes into
+        the first spare one, which no reader can see yet, so most appends
+        copy nothing; when none is left, the rows are copied once into
+        buffers a quarter larger.
+        """
+        count = len(snapshot.ids)
+        ids, matrix = snapshot.ids.base, snapshot.matrix.base
+        # Only appends leave views of a larger array, and the live snapshot is the newest of them
+        if not isinstance(ids, np.ndarray) or not isinstance(matrix, np.ndarray) or len(matrix) == count:
+            capacity = count + max(count // 4, 16)
+            ids = np.empty(capacity, dtype=np.int64)
+            matrix = np.empty((capacity, snapshot.matrix.shape[1]), dtype=np.float32)
+            ids[:count] = snapshot.ids
+            matrix[:count] = snapshot.matrix
+        ids[count] = question_id
+        matrix[count] = vector
+        return ids[:count + 1], matrix[:count + 1]
+
+    def remove(self, question_id):
+        self._record_change()
+        if self._shared():
+            self._bump()
+            self._schedule_publish()
+            return
+        with self._lock:
+            self._corpus_version += 1
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            row = snapshot.positions.get(question_id)
+            if row is None:
+                return
+            labels = snapshot.labels
+            if labels is not None:
+                labels = np.delete(labels, row)
+            codes = snapshot.codes
+            if codes is not None:
+                codes = codes.deleted(row)
+            self._snapshot = _Snapshot(
+                np.delete(snapshot.ids, row),
+                np.delete(snapshot.matrix, row, axis=0),
+                snapshot.centroids,
+                labels,
+                codes,
+            )
+
+    def search(self, query_embedding, limit, nprobe=None, exclude=None, snapshot=None):
+        """Return ``(ids, scores)`` of the ``limit`` most similar questions, best first.
+
+        ``exclude`` is a sorted int64 array of question ids left out of the
+        results; their rows are masked before top-k, so the ``limit`` results
+        are still the best of the rest. Given a ``snapshot`` (from
+        ``snapshot()``), it is scored as is and the database is not touched.
+        """
+        snapshot = snapshot or self.snapshot()
+        if limit <= 0 or len(snapshot.ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = normalize(query_embedding)
+        excluded = snapshot.rows_of(exclude) if exclude is not None and len(exclude) else None
+        with phase('score'):
+            rows, scores = self._score(snapshot, query, limit, nprobe, excluded)
+        with phase('sort'):
+            top = top_k(scores, limit)
+            if excluded is not None:
+                top = top[np.isfinite(scores[top])]
+        if rows is None:
+            return snapshot.ids[top], scores[top]
+        return snapshot.ids[rows[top]], scores[top]
+
+    def _score(self, snapshot, query, limit, nprobe, excluded=None):
+        """Return ``(rows, scores)``: exact scores of candidate ``rows``, or of every row when ``rows`` is None.
+
+        Scores of ``excluded`` rows are -inf, or those rows are left out of ``rows``.
+        """
+        if snapshot.labels is not None and len(snapshot.ids) >= settings.RANKING['EXACT_THRESHOLD']:
+            rows = ann.candidates(
+                snapshot.centroids,
+                snapshot.lists,
+                query,
+                nprobe or settings.RANKING['IVF_NPROBE'],
+            )
+            if excluded is not None:
+                rows = rows[~np.isin(rows, excluded)]
+            # Sparse cells can leave too few candidates; fall back to exact
+            if len(rows) >= limit:
+                return rows, snapshot.matrix[rows] @ query
+
+        if snapshot.codes is not None:
+            # Cheap compressed scan, then exact re-rank of the survivors
+            candidates = max(limit, settings.RANKING['RERANK_CANDIDATES'])
+            coarse = snapshot.codes.score(query)
+            if excluded is not None:
+                coarse[excluded] = -np.inf
+            rows = top_k(coarse, candidates)
+            if excluded is not None:
+                rows = rows[np.isfinite(coarse[rows])]
+            return rows, snapshot.matrix[rows] @ query
+
+        scores = snapshot.matrix @ query
+        if excluded is not None:
+            scores[excluded] = -np.inf
+        return None, scores
+
+    def vectors(self, ids, snapshot=None):
+        """Normalized embeddings of ``ids``, zero for ids that are not indexed."""
+        snapshot = snapshot or self.snapshot()
+        rows = np.fromiter((snapshot.positions.get(question_id, -1) for question_id in ids), np.int64, len(ids))
+        if not snapshot.matrix.size:
+            return np.zeros((len(ids), 0), dtype=np.float32)
+        vectors = snapshot.matrix[np.maximum(rows, 0)]
+        vectors[rows < 0] = 0
+        return vectors
+
+    def memory_usage(self):
+        """Bytes held by each part of the current snapshot."""
+        snapshot = self.snapshot()
+        usage = {'vectors': snapshot.matrix.nbytes, 'ids': snapshot.ids.nbytes}
+        if snapshot.codes is not None:
+            usage['codes'] = snapshot.codes.nbytes
+        if snapshot.labels is not None:
+            usage['ivf'] = snapshot.labels.nbytes + snapshot.centroids.nbytes
+        return usage
+
+
+ranking_index = RankingIndex()
+
+
+def rank_ids(query_embedding, limit, exclude=None, snapshot=None):
+    """Ids of the ``limit`` questions closest to ``query_embedding``, best first, none of them in ``exclude``."""
+    return ranking_index.search(query_embedding, limit, exclude=exclude, snapshot=snapshot)[0].tolist()
+
+
+def reciprocal_rank_fusion(rankings, limit, k=RRF_K):
+    """Fuse id lists, best first: each list adds ``1 / (k + rank)`` to the score of its ids."""
+    rankings = [np.asarray(ids, dtype=np.int64) for ids in rankings if len(ids)]
+    if not rankings:
+        return []
+    ids, positions = np.unique(np.concatenate(rankings), return_inverse=True)
+    contributions = np.concatenate([1.0 / (k + np.arange(1, len(ranking) + 1)) for ranking in rankings])
+    scores = np.bincount(positions, weights=contributions, minlength=len(ids))
+    return ids[top_k(scores, limit)].tolist()
+
+
+def diversify(ids, start, stop, diversity, pool, snapshot=None):
+    """Copy of ``ids`` whose positions ``start:stop`` are MMR picks from the ``pool`` ids from ``start`` on.
+
+    Candidates that were not picked keep their relative order after the
+    picks, so later calls can diversify the following window the same way.
+    """
+    window = ids[start:start + max(pool, stop - start)]
+    picks = mmr(ranking_index.vectors(window.tolist(), snapshot), stop - start, diversity)
+    rest = np.delete(np.arange(len(window)), picks)
+    reordered = ids.copy()
+    reordered[start:start + len(window)] = window[np.concatenate([picks, rest])]
+    return reordered
+
+
+def fetch_questions(ids):
+    """Questions for ``ids`` in the same order, skipping ids deleted meanwhile."""
+    questions = Question.objects.defer('embedding').in_bulk(ids)
+    return [questions[question_id] for question_id in ids if question_id in questions]
+
+
+async def afetch_questions(ids):
+    questions = await Question.objects.defer('embedding').ain_bulk(ids)
+    return [questions[question_id] for question_id in ids if question_id in questions]
+
+
+def rank_questions(query_embedding, limit):
+    """Return the ``limit`` questions closest to ``query_embedding``, best first."""
+    return fetch_questions(rank_ids(query_embedding, limit))
@@ -0,0 +1,77 @@
+"""Per-player sets of already answered questions, for excluding them from rankings.
+
+Filtering a ranking against a player's Answer history in SQL costs a join
+that grows with every game. Instead each player's answered question ids are
+kept as a sorted int64 array in an in-process LRU, loaded with one query on
+first use and merged with every submitted game, and the ranking engines
+mask those rows out before top-k selection.
+
+Entries are reloaded ``ttl`` seconds after they were read from the database,
+which bounds how stale a worker's copy can be when the player's last game
+was submitted to a different worker.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .caching import LRUCache
+from .models import Answer
+
+
+class SeenQuestions:
+    """Sorted arrays of the question ids each player has answered."""
+
+    def __init__(self, max_entries, ttl):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries)
+        self.hits = 0
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Sorted ids of the questions ``user_id`` has answered."""
+        entry = self.memory.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        loaded_at = time.monotonic()
+        ids = np.unique(np.fromiter(
+            Answer.objects.filter(session__user_id=user_id).values_list('question_id', flat=True).distinct(),
+            dtype=np.int64,
+        ))
+        with self._lock:
+            self.loads += 1
+        self.memory.set(user_id, (loaded_at, ids))
+        return ids
+
+    def add(self, user_id, question_ids):
+        """Merge newly answered ``question_ids`` into a cached set; uncached sets load them later."""
+        question_ids = np.asarray(list(question_ids), dtype=np.int64)
+        # Under the lock so two games of one player submitted at once both land
+        with self._lock:
+            entry = self.memory.get(user_id)
+            if entry is not None:
+                self.memory.set(user_id, (entry[0], np.union1d(entry[1], question_ids)))
+
+    def forget(self, user_id):
+        """Drop a cached set, e.g. after answers were deleted; it is reloaded on next use."""
+        self.memory.pop(user_id)
+
+    def stats(self):
+        lookups = self.hits + self.loads
+        return {
+            'hits': self.hits,
+            'loads': self.loads,
+            'entries': len(self.memory),
+            'hit_rate': (self.hits / lookups) * 100 if lookups else 0,
+        }
+
+    def clear(self):
+        self.memory.clear()
+
+
+seen_questions = SeenQuestions(settings.SEEN_QUESTIONS_CACHE_SIZE, settings.SEEN_QUESTIONS_TTL)
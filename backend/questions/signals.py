@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters
+from .lexical import lexical_index
+from .models import Answer, GameSession, Question, QuestionReport
+from .ranking import ranking_index
+from .seen import seen_questions
+
+
+@receiver(post_save, sender=Question)
+def update_ranking_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'embedding' in update_fields:
+        ranking_index.upsert(instance.id, instance.vector)
+    elif {'question_text', 'answer'} & set(update_fields):
+        # The vector is unchanged (the admin defers it), but lexical rankings are not
+        ranking_index.touch()
+    lexical_index.changed()
+
+
+@receiver(post_delete, sender=Question)
+def remove_from_ranking_index(sender, instance, **kwargs):
+    ranking_index.remove(instance.id)
+    lexical_index.changed()
+
+
+# Answers and reports are created through the API views, which update the
+# counters themselves. Edits and deletions (admin, cascades) are rare, so
+# those recount the affected questions from their raw rows.
+#
+# There is deliberately no Answer delete receiver: one would stop Django
+# from deleting cascaded answers in bulk and recount row by row. Instead
+# the questions are collected once per deleted game or player and
+# recounted after the delete (the Answer admin recounts by itself). When a
+# question is deleted its own counters go with it.
+
+def _deleted_with(origin, model):
+    """Whether a delete was started on ``model``, as an instance or a queryset."""
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
+
+def _recount(question_ids, fields):
+    if question_ids:
+        counters.recount(question_ids, fields=fields)
+
+
+@receiver(pre_delete, sender=User)
+def collect_player_questions(sender, instance, **kwargs):
+    instance._answered_question_ids = set(
+        Answer.objects.filter(session__user=instance).values_list('question_id', flat=True)
+    )
+    instance._reported_question_ids = set(instance.reports.values_list('question_id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def recount_player_questions(sender, instance, **kwargs):
+    _recount(getattr(instance, '_answered_question_ids', None), ['times_answered', 'correct_count'])
+    _recount(getattr(instance, '_reported_question_ids', None), ['open_report_count'])
+
+
+@receiver(pre_delete, sender=GameSession)
+def collect_game_questions(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, User):
+        instance._answered_question_ids = set(instance.answers.values_list('question_id', flat=True))
+
+
+@receiver(post_delete, sender=GameSession)
+def recount_game_questions(sender, instance, **kwargs):
+    _recount(getattr(instance, '_answered_question_ids', None), ['times_answered', 'correct_count'])
+
+
+@receiver(post_save, sender=QuestionReport)
+def recount_reports_on_save(sender, instance, created, **kwargs):
+    if not created:
+        counters.recount([instance.question_id], fields=['open_report_count'])
+
+
+@receiver(post_delete, sender=QuestionReport)
+def recount_reports_on_delete(sender, instance, origin=None, **kwargs):
+    if not (_deleted_with(origin, User) or _deleted_with(origin, Question)):
+        counters.recount([instance.question_id], fields=['open_report_count'])
+
+
+# A deleted game's questions count as unseen again. Answers deleted on their
+# own are picked up when the cached set expires (SEEN_QUESTIONS_TTL).
+
+@receiver(post_delete, sender=GameSession)
+def forget_seen_questions(sender, instance, **kwargs):
+    seen_questions.forget(instance.user_id)
@@ -0,0 +1,118 @@
+"""Versioned on-disk embedding snapshots shared by every server worker.
+
+Each version is a directory holding ``vectors.npy`` (the pre-normalized
+float32 matrix) and ``ids.npy`` (the question id of every row). A small
+JSON manifest, ``CURRENT``, names the live version and is replaced
+atomically, so a reader sees either the old or the new snapshot and never
+a partially written one. Publishers take an exclusive ``flock`` on the
+``.lock`` file first, so two processes never write at the same time and
+the last version made live was read from the database last. Workers open the arrays with ``mmap_mode='r'``;
+the OS page cache then holds one physical copy for all of them.
+"""
+import fcntl
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+MANIFEST = 'CURRENT'
+LOCK = '.lock'
+KEEP_VERSIONS = 2
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_manifest(directory):
+    """Return the live version's manifest, or ``None`` if nothing was published yet."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _publisher_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def publish(directory, read, initial=False):
+    """Write ``read()``'s ``(ids, matrix)`` as the live version and return its manifest.
+
+    ``read`` runs under the publisher lock. With ``initial`` nothing is
+    written when another process made a version live while we waited for
+    the lock; its manifest is returned instead.
+    """
+    with _publisher_lock(directory):
+        if initial:
+            manifest = read_manifest(directory)
+            if manifest is not None:
+                return manifest
+        return _write(directory, *read())
+
+
+def write(directory, ids, matrix):
+    """Write ``ids`` and ``matrix`` as a new version, make it live and return its manifest."""
+    with _publisher_lock(directory):
+        return _write(directory, ids, matrix)
+
+
+def _write(directory, ids, matrix):
+    version = f'{time.time_ns()}-{os.getpid()}'
+    tmp_path = os.path.join(directory, f'.tmp-{version}')
+    os.makedirs(tmp_path)
+    for name, array in (('ids', ids), ('vectors', matrix)):
+        path = os.path.join(tmp_path, f'{name}.npy')
+        np.save(path, array)
+        _fsync(path)
+    os.rename(tmp_path, os.path.join(directory, version))
+
+    manifest = {'version': version, 'count': int(matrix.shape[0]), 'dimensions': int(matrix.shape[1])}
+    manifest_path = os.path.join(directory, MANIFEST)
+    tmp_manifest = f'{manifest_path}.{version}.tmp'
+    with open(tmp_manifest, 'w') as tmp:
+        json.dump(manifest, tmp)
+        tmp.flush()
+        os.fsync(tmp.fileno())
+    os.replace(tmp_manifest, manifest_path)
+
+    prune(directory)
+    return manifest
+
+
+def load(directory, manifest):
+    """Memory-map the ``(ids, matrix)`` of ``manifest``'s version read-only."""
+    path = os.path.join(directory, manifest['version'])
+    # Zero-length arrays cannot be mapped
+    mmap_mode = 'r' if manifest['count'] else None
+    ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode=mmap_mode)
+    return ids, np.load(os.path.join(path, 'vectors.npy'), mmap_mode=mmap_mode)
+
+
+def prune(directory, keep=KEEP_VERSIONS):
+    """Delete all but the newest ``keep`` versions.
+
+    Workers still mapping a deleted version keep reading it until they
+    swap; the files are only freed once the last mapping is closed.
+    """
+    versions = sorted(
+        (name for name in os.listdir(directory) if name[0].isdigit()),
+        key=lambda name: int(name.split('-')[0]),
+    )
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from questions.caching import query_embedding_cache, ranked_result_cache, ranking_cursors
+from questions.embeddings import get_embedding_provider
+from questions.lexical import lexical_index
+from questions.models import Question
+from questions.ranking import ranking_index
+from questions.seen import seen_questions
+
+LOCAL_EMBEDDINGS = {**settings.EMBEDDINGS, 'BACKEND': 'local', 'DIMENSIONS': 64}
+
+
+def make_question(text, answer='answer'):
+    question = Question(question_text=text, answer=answer)
+    question.set_embedding(get_embedding_provider().embed_one(text))
+    question.save()
+    return question
+
+
+@override_settings(EMBEDDINGS=LOCAL_EMBEDDINGS)
+class QuestionAPITestCase(TestCase):
+    """Questions on two topics, a player with an API client, and fresh process-wide caches."""
+
+    def setUp(self):
+        get_embedding_provider.cache_clear()
+        self.addCleanup(get_embedding_provider.cache_clear)
+        for cache in (query_embedding_cache, ranked_result_cache, ranking_cursors, seen_questions):
+            cache.clear()
+        for i in range(30):
+            make_question(f'Which planet is number {i} from the star', f'answer {i}')
+            make_question(f'Which emperor ruled Rome in year {i}', f'answer {i}')
+        ranking_index.invalidate()
+        lexical_index.invalidate()
+
+        self.user = User.objects.create_user('player', password='secret')
+        self.client = self.client_for(self.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def rank(self, client=None, **data):
+        return (client or self.client).post('/api/questions/ranked/', {'query': 'planet star', **data}, format='json')
+
+    def submit(self, question_ids, answer='answer 0', client=None):
+        answers = [{'question_id': question_id, 'answer': answer} for question_id in question_ids]
+        return (client or self.client).post(
+            '/api/questions/submit/', {'query': 'planets', 'answers': answers}, format='json'
+        )
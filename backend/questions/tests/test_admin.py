@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from questions.admin import STATS_CACHE_KEY
+from questions.models import GameSession, Question
+
+
+class AdminTestCase(TestCase):
+    def setUp(self):
+        cache.delete(STATS_CACHE_KEY)
+        self.addCleanup(cache.delete, STATS_CACHE_KEY)
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def add_questions(self, count, times_answered=0, correct_count=0):
+        Question.objects.bulk_create(
+            Question(
+                question_text=f'Question {Question.objects.count() + i}',
+                answer='answer',
+                embedding=b'',
+                times_answered=times_answered,
+                correct_count=correct_count,
+            )
+            for i in range(count)
+        )
+
+    def count_queries(self, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400)
+        return len(queries)
+
+
+class QuestionChangelistTests(AdminTestCase):
+    def test_query_count_does_not_grow_with_the_rows(self):
+        self.add_questions(5, times_answered=4, correct_count=3)
+        few = self.count_queries('get', '/admin/questions/question/')
+        self.add_questions(45, times_answered=4, correct_count=1)
+
+        self.assertEqual(self.count_queries('get', '/admin/questions/question/'), few)
+
+    def test_sorts_by_accuracy(self):
+        self.add_questions(1, times_answered=10, correct_count=9)
+        self.add_questions(1, times_answered=10, correct_count=1)
+        self.add_questions(1)
+
+        response = self.client.get('/admin/questions/question/?o=5')
+
+        accuracies = [row._accuracy for row in response.context['cl'].result_list]
+        self.assertEqual(accuracies[1:], [10.0, 90.0])
+        self.assertContains(response, '10.0%')
+
+
+class StatsDashboardTests(AdminTestCase):
+    def test_snapshot_is_cached_until_refreshed(self):
+        self.add_questions(3)
+        GameSession.objects.create(user=User.objects.create_user('player'), query='planets')
+        first = self.count_queries('get', '/admin/stats/')
+
+        self.assertLess(self.count_queries('get', '/admin/stats/'), first)
+        GameSession.objects.create(user=User.objects.get(username='player'), query='planets')
+        self.assertEqual(self.client.get('/admin/stats/').context['total_games'], 1)
+
+        response = self.client.post('/admin/stats/refresh/')
+        self.assertRedirects(response, '/admin/stats/')
+        self.assertEqual(self.client.get('/admin/stats/').context['total_games'], 2)
+
+    def test_refresh_requires_post(self):
+        self.assertEqual(self.client.get('/admin/stats/refresh/').status_code, 405)
+
+    def test_hardest_questions_need_five_answers(self):
+        self.add_questions(1, times_answered=4, correct_count=0)
+        self.add_questions(1, times_answered=10, correct_count=2)
+        self.add_questions(1, times_answered=5, correct_count=4)
+
+        hardest = self.client.get('/admin/stats/').context['difficult_questions']
+
+        self.assertEqual([(row['accuracy'], row['total']) for row in hardest], [(20.0, 10), (80.0, 5)])
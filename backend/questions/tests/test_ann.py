@@ -0,0 +1,80 @@
+import io
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from questions import ann
+from questions.embeddings import get_embedding_provider
+from questions.models import CorpusVersion
+from questions.ranking import ranking_index
+from questions.tests.base import QuestionAPITestCase, make_question
+
+
+class CandidatesTests(SimpleTestCase):
+    def test_returns_the_rows_of_the_closest_cells(self):
+        centroids = np.eye(3, dtype=np.float32)
+        lists = ann.InvertedLists(np.array([0, 1, 2, 0, 1], dtype=np.int32), 3)
+        query = np.array([0.9, 0.1, 0], dtype=np.float32)
+
+        self.assertEqual(sorted(ann.candidates(centroids, lists, query, 1).tolist()), [0, 3])
+        self.assertEqual(sorted(ann.candidates(centroids, lists, query, 2).tolist()), [0, 1, 3, 4])
+        self.assertEqual(sorted(ann.candidates(centroids, lists, query, 10).tolist()), [0, 1, 2, 3, 4])
+
+
+class IVFRankingTests(QuestionAPITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        ranking = {
+            **settings.RANKING,
+            'BACKEND': 'ivf',
+            'EXACT_THRESHOLD': 0,
+            'IVF_PATH': os.path.join(tmp.name, 'ivf.npz'),
+        }
+        override = override_settings(RANKING=ranking)
+        override.enable()
+        self.addCleanup(override.disable)
+        super().setUp()
+
+    def build(self, **options):
+        call_command('build_ann_index', nlist=4, stdout=io.StringIO(), **options)
+
+    def search(self, text, limit, nprobe):
+        return ranking_index.search(get_embedding_provider().embed_one(text), limit, nprobe=nprobe)[0].tolist()
+
+    def test_building_the_index_bumps_the_corpus_version_once(self):
+        version = CorpusVersion.current()
+        self.build()
+
+        self.assertEqual(CorpusVersion.current(), version + 1)
+        self.assertIsNotNone(ranking_index.snapshot().labels)
+
+    def test_probing_every_cell_matches_the_exact_ranking(self):
+        self.build()
+        query = get_embedding_provider().embed_one('planet star')
+        with override_settings(RANKING={**settings.RANKING, 'BACKEND': 'exact'}):
+            exact = ranking_index._build()
+
+        # Questions on one topic tie, so compare the scores rather than the order of equals
+        np.testing.assert_allclose(
+            ranking_index.search(query, 10, nprobe=4)[1],
+            ranking_index.search(query, 10, snapshot=exact)[1],
+            rtol=1e-5,
+        )
+
+    def test_too_few_candidates_fall_back_to_the_exact_scan(self):
+        self.build()
+
+        self.assertEqual(len(self.search('planet star', 60, nprobe=1)), 60)
+
+    def test_questions_added_after_training_get_a_cell(self):
+        self.build()
+        question = make_question('Which nebula hides the quasar')
+
+        snapshot = ranking_index.snapshot()
+        self.assertGreaterEqual(snapshot.labels[snapshot.positions[question.id]], 0)
+        self.assertEqual(self.search('Which nebula hides the quasar', 1, nprobe=4), [question.id])
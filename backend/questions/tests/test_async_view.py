@@ -0,0 +1,45 @@
+from rest_framework.test import APIClient
+
+from questions.tests.base import QuestionAPITestCase, make_question
+
+
+class AsyncRankedQuestionsViewTests(QuestionAPITestCase):
+    def arank(self, client=None, **data):
+        return (client or self.client).post(
+            '/api/questions/ranked/async/', {'query': 'planet star', **data}, format='json'
+        )
+
+    def result_ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [question['id'] for question in response.json()['results']]
+
+    def test_matches_the_sync_view_in_every_mode(self):
+        for mode in ('semantic', 'lexical', 'hybrid'):
+            with self.subTest(mode=mode):
+                expected = self.result_ids(self.rank(mode=mode, limit=10))
+                self.assertEqual(self.result_ids(self.arank(mode=mode, limit=10)), expected)
+
+    def test_matches_the_sync_view_when_diversified(self):
+        expected = self.result_ids(self.rank(limit=5, diversity=0.5))
+        self.assertEqual(self.result_ids(self.arank(limit=5, diversity=0.5)), expected)
+
+    def test_cursor_pages_continue_the_ranking(self):
+        first = self.arank(limit=5).json()
+        second = self.arank(limit=5, cursor=first['cursor'], offset=first['next_offset']).json()
+
+        self.assertEqual(
+            [question['id'] for question in first['results'] + second['results']],
+            self.result_ids(self.rank(limit=10)),
+        )
+
+    def test_sees_questions_added_after_the_index_was_built(self):
+        self.arank(mode='lexical')
+        question = make_question('Which nebula hides the quasar', 'answer')
+
+        self.assertIn(question.id, self.result_ids(self.arank(query='nebula quasar', mode='lexical')))
+
+    def test_requires_a_token(self):
+        self.assertEqual(self.arank(client=APIClient()).status_code, 401)
+
+    def test_rejects_an_invalid_limit(self):
+        self.assertEqual(self.arank(limit=0).status_code, 400)
@@ -0,0 +1,77 @@
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from questions.embeddings import get_embedding_provider, text_hash
+from questions.tests.base import LOCAL_EMBEDDINGS
+
+# The script lives next to backend/, outside any package
+spec = importlib.util.spec_from_file_location(
+    'calculate_embeddings', settings.BASE_DIR.parent / 'calculate_embeddings.py'
+)
+calculate_embeddings = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(calculate_embeddings)
+
+
+@override_settings(EMBEDDINGS=LOCAL_EMBEDDINGS)
+class CalculateEmbeddingsTests(SimpleTestCase):
+    def setUp(self):
+        get_embedding_provider.cache_clear()
+        self.addCleanup(get_embedding_provider.cache_clear)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.csv_path = os.path.join(tmp.name, 'questions.csv')
+        self.output_path = os.path.join(tmp.name, 'embeddings.jsonl')
+        self.export_path = os.path.join(tmp.name, 'embeddings.json')
+        with open(self.csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['questions', 'answer'])
+            for i in range(7):
+                writer.writerow([f'Which moon is number {i}', f'moon {i}'])
+
+    def run_script(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            calculate_embeddings.calculate_embeddings(
+                csv_path=self.csv_path,
+                output_path=self.output_path,
+                export_path=self.export_path,
+                batch_size=2,
+                workers=2,
+            )
+
+    def records(self):
+        with open(self.output_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_embeds_every_row_and_exports_a_json_array(self):
+        self.run_script()
+
+        self.assertEqual(sorted(record['answer'] for record in self.records()), [f'moon {i}' for i in range(7)])
+        with open(self.export_path, encoding='utf-8') as f:
+            exported = json.load(f)
+        self.assertEqual(len(exported), 7)
+        self.assertEqual(len(exported[0]['embedding']), LOCAL_EMBEDDINGS['DIMENSIONS'])
+
+    def test_resume_truncates_a_torn_line_and_skips_finished_rows(self):
+        done = {'hash': text_hash('Which moon is number 0'), 'question': 'Which moon is number 0', 'answer': 'kept'}
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(done) + '\n')
+            f.write('{"hash": "torn", "quest')
+
+        self.assertEqual(calculate_embeddings.load_checkpoint(self.output_path), {done['hash']})
+        with open(self.output_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), json.dumps(done) + '\n')
+
+        self.run_script()
+
+        records = self.records()
+        self.assertEqual(records[0], done)
+        self.assertEqual(len(records), 7)
+        self.assertEqual(len({record['hash'] for record in records}), 7)
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from questions.coalescing import SingleFlight
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_in_threads(self, target, count):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return results
+
+    def wait_for_followers(self, flight, count):
+        deadline = time.monotonic() + 5
+        while flight.coalesced < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight(timeout=5)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            self.wait_for_followers(flight, 3)
+            return 'ranking'
+
+        results = self.run_in_threads(lambda: flight.do('key', compute), 4)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['ranking'] * 4)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight(timeout=5)
+
+        def compute():
+            self.wait_for_followers(flight, 2)
+            raise KeyError('missing')
+
+        def call():
+            try:
+                flight.do('key', compute)
+            except KeyError as e:
+                return e
+
+        self.assertEqual(len([e for e in self.run_in_threads(call, 3) if isinstance(e, KeyError)]), 3)
+
+    def test_coroutines_on_different_event_loops_share_one_call(self):
+        # Under WSGI every async view runs on an event loop of its own
+        flight = SingleFlight(timeout=5)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            while flight.coalesced < 3:
+                await asyncio.sleep(0.01)
+            return 'ranking'
+
+        results = self.run_in_threads(lambda: asyncio.run(flight.ado('key', compute)), 4)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['ranking'] * 4)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_followers_compute_after_a_timeout(self):
+        flight = SingleFlight(timeout=0.05)
+        release = threading.Event()
+
+        async def slow():
+            await asyncio.to_thread(release.wait, 5)
+            return 'leader'
+
+        async def fast():
+            return 'follower'
+
+        async def follower():
+            while not flight.stats()['in_flight']:
+                await asyncio.sleep(0.01)
+            result = await flight.ado('key', fast)
+            release.set()
+            return result
+
+        leader = threading.Thread(target=lambda: asyncio.run(flight.ado('key', slow)))
+        leader.start()
+        self.assertEqual(asyncio.run(follower()), 'follower')
+        leader.join(5)
+        self.assertEqual(flight.timeouts, 1)
@@ -0,0 +1,72 @@
+import io
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from questions.admin import AnswerAdmin
+from questions.models import Answer, GameSession, Question, QuestionReport
+
+from .base import QuestionAPITestCase
+
+
+class CounterTests(QuestionAPITestCase):
+    def assertCountersMatchRawRows(self):
+        call_command('rebuild_question_counters', verify=True, stdout=io.StringIO())
+
+    def play(self, client, games, ids):
+        for _ in range(games):
+            self.submit(ids, client=client)
+
+    def test_submit_and_report_keep_counters_in_sync(self):
+        question = Question.objects.first()
+        self.submit([question.id], answer='answer 0')
+        self.submit([question.id], answer='wrong')
+        response = self.client.post(
+            '/api/questions/report/', {'question_id': question.id, 'report_type': 'unclear'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        question.refresh_from_db()
+        self.assertEqual((question.times_answered, question.correct_count, question.open_report_count), (2, 1, 1))
+        self.assertCountersMatchRawRows()
+
+    def test_deleting_a_player_recounts_once(self):
+        ids = list(Question.objects.values_list('id', flat=True)[:10])
+        query_counts = []
+        for games in (1, 10):
+            player = User.objects.create_user(f'leaving-{games}')
+            client = self.client_for(player)
+            self.play(client, games, ids)
+            client.post('/api/questions/report/', {'question_id': ids[0], 'report_type': 'other'}, format='json')
+            with CaptureQueriesContext(connection) as queries:
+                player.delete()
+            query_counts.append(len(queries))
+            self.assertCountersMatchRawRows()
+        # Cascaded answers are deleted in bulk, not loaded and recounted one by one
+        self.assertEqual(query_counts[0], query_counts[1], query_counts)
+
+    def test_deleting_games_and_questions_keeps_counters_in_sync(self):
+        ids = list(Question.objects.values_list('id', flat=True)[:5])
+        self.play(self.client, 3, ids)
+        GameSession.objects.filter(user=self.user).first().delete()
+        self.assertCountersMatchRawRows()
+        GameSession.objects.filter(user=self.user).delete()
+        self.assertCountersMatchRawRows()
+
+        self.play(self.client, 1, ids)
+        QuestionReport.objects.create(user=self.user, question_id=ids[1], report_type='other')
+        Question.objects.filter(id__in=ids[:2]).delete()
+        self.assertCountersMatchRawRows()
+
+    def test_answer_admin_deletes_recount(self):
+        ids = list(Question.objects.values_list('id', flat=True)[:3])
+        self.play(self.client, 2, ids)
+        model_admin = AnswerAdmin(Answer, admin.site)
+        request = RequestFactory().post('/')
+        model_admin.delete_model(request, Answer.objects.first())
+        model_admin.delete_queryset(request, Answer.objects.filter(question_id=ids[1]))
+        self.assertCountersMatchRawRows()
@@ -0,0 +1,40 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from questions.ranking import mmr
+from questions.tests.base import QuestionAPITestCase
+
+
+class MMRTests(SimpleTestCase):
+    def test_without_diversity_keeps_relevance_order(self):
+        vectors = np.eye(4, dtype=np.float32)
+        self.assertEqual(mmr(vectors, 3, 0.0).tolist(), [0, 1, 2])
+
+    def test_skips_near_duplicates(self):
+        vectors = np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32)
+        self.assertEqual(mmr(vectors, 2, 0.5).tolist(), [0, 2])
+
+
+class DiversifiedRankingTests(QuestionAPITestCase):
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [question['id'] for question in response.data['results']]
+
+    def test_pages_stay_disjoint_and_cover_the_ranking(self):
+        first = self.rank(limit=10, diversity=0.7)
+        second = self.rank(limit=10, diversity=0.7, cursor=first.data['cursor'], offset=10)
+
+        ids = self.ids(first) + self.ids(second)
+        self.assertEqual(len(set(ids)), 20)
+
+    def test_diversity_pulls_in_questions_from_further_down(self):
+        plain = self.ids(self.rank(limit=10))
+        diverse = self.ids(self.rank(limit=10, diversity=0.9))
+
+        self.assertEqual(diverse[0], plain[0])
+        self.assertEqual(len(set(diverse)), 10)
+        self.assertNotEqual(set(diverse), set(plain))
+
+    def test_rejects_out_of_range_diversity(self):
+        for diversity in (-0.1, 1.5, 'much'):
+            self.assertEqual(self.rank(diversity=diversity).status_code, 400, diversity)
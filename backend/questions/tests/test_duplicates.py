@@ -0,0 +1,38 @@
+import csv
+import io
+import os
+import tempfile
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from questions.duplicates import scan_rows
+from questions.models import CorpusVersion
+from questions.tests.base import QuestionAPITestCase, make_question
+
+
+class ScanRowsTests(SimpleTestCase):
+    def test_reports_each_pair_once(self):
+        matrix = np.array([[1, 0], [1, 0], [0, 1], [0.6, 0.8]], dtype=np.float32)
+        rows, cols, scores = scan_rows(matrix, 0, len(matrix), 0.99, top_m=5, column_block=2)
+
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist())), [(0, 1)])
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+
+
+class FindDuplicatesTests(QuestionAPITestCase):
+    def test_reports_copies_without_touching_the_live_index(self):
+        original = make_question('Which ocean is the deepest')
+        copy = make_question('Which ocean is the deepest')
+        version = CorpusVersion.current()
+        output = os.path.join(tempfile.mkdtemp(), 'pairs.csv')
+        self.addCleanup(os.remove, output)
+
+        call_command('find_duplicates', threshold=0.999, output=output, report_as='player', stdout=io.StringIO())
+
+        with open(output, newline='', encoding='utf-8') as f:
+            pairs = [(int(row['question_id']), int(row['duplicate_id'])) for row in csv.DictReader(f)]
+        self.assertEqual(pairs, [(original.id, copy.id)])
+        self.assertEqual(copy.reports.get().report_type, 'repeated')
+        self.assertEqual(CorpusVersion.current(), version)
@@ -0,0 +1,60 @@
+import random
+
+from django.test import SimpleTestCase
+
+from questions.fuzzy import (
+    BANDED_MIN_LENGTH,
+    banded_distance,
+    bit_parallel_distance,
+    grade_answers,
+    levenshtein_distance,
+    within_distance,
+)
+
+
+class FuzzyMatchingTests(SimpleTestCase):
+    def random_pairs(self, count, alphabet='abc', max_length=9):
+        rng = random.Random(0)
+        for _ in range(count):
+            yield (
+                ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))),
+                ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))),
+            )
+
+    def test_bounded_matchers_agree_with_full_levenshtein(self):
+        for a, b in self.random_pairs(2000):
+            distance = levenshtein_distance(a, b)
+            for k in range(4):
+                capped = min(distance, k + 1)
+                self.assertEqual(banded_distance(a, b, k), capped, (a, b, k))
+                self.assertEqual(bit_parallel_distance(a, b, k), capped, (a, b, k))
+                self.assertEqual(within_distance(a, b, k), distance <= k, (a, b, k))
+
+    def test_empty_strings_respect_the_cap(self):
+        for k in range(3):
+            for n in range(6):
+                self.assertEqual(banded_distance('x' * n, '', k), min(n, k + 1))
+                self.assertEqual(banded_distance('', 'x' * n, k), min(n, k + 1))
+                self.assertEqual(bit_parallel_distance('x' * n, '', k), min(n, k + 1))
+        self.assertEqual(bit_parallel_distance('abc', ''), 3)
+
+    def test_long_answers_use_the_banded_matcher(self):
+        a = 'ab' * BANDED_MIN_LENGTH
+        b = a[:10] + 'x' + a[11:]
+        self.assertTrue(within_distance(a, b, 1))
+        self.assertFalse(within_distance(a, b[1:] + 'y', 1))
+
+    def test_grade_answers_matches_levenshtein(self):
+        pairs = list(self.random_pairs(500))
+        expected = [
+            user.strip().lower() == correct.strip().lower()
+            or (user.strip() != '' and levenshtein_distance(user.strip().lower(), correct.strip().lower()) <= 2)
+            for user, correct in pairs
+        ]
+        self.assertEqual(grade_answers(pairs), expected)
+
+    def test_grade_answers_normalizes_and_rejects_blank_answers(self):
+        self.assertEqual(
+            grade_answers([(' Paris ', 'paris'), ('pariss', 'Paris'), ('', 'ab'), ('', ''), ('lyon', 'paris')]),
+            [True, True, False, True, False],
+        )
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+
+from questions.models import GameSession, Question
+from questions.tests.base import QuestionAPITestCase
+
+
+class GameHistoryTests(QuestionAPITestCase):
+    def test_pages_cover_every_game_once_newest_first(self):
+        sessions = GameSession.objects.bulk_create(
+            GameSession(user=self.user, query=f'game {i}') for i in range(25)
+        )
+        GameSession.objects.create(user=User.objects.create_user('other'), query='not mine')
+
+        seen = []
+        url = '/api/questions/history/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 10)
+            seen += [game['id'] for game in response.data['results']]
+            url = response.data['next']
+
+        expected = GameSession.objects.filter(user=self.user).order_by('-created_at', '-id')
+        self.assertEqual(seen, [session.id for session in expected])
+        self.assertEqual(len(seen), len(sessions))
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/questions/history/?cursor=bogus').status_code, 404)
+
+
+class GameDetailTests(QuestionAPITestCase):
+    def test_query_count_does_not_grow_with_the_answers(self):
+        ids = list(Question.objects.values_list('id', flat=True))
+        for count in (2, 20):
+            self.submit(ids[:count])
+            session = GameSession.objects.filter(user=self.user).latest('id')
+            # Auth, the session, then its answers with their questions
+            with self.assertNumQueries(3):
+                response = self.client.get(f'/api/questions/history/{session.id}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['answers']), count)
+            self.assertEqual(response.data['answers'][0]['correct_answer'], 'answer 0')
+
+    def test_other_players_games_are_not_found(self):
+        session = GameSession.objects.create(user=User.objects.create_user('other'), query='not mine')
+
+        self.assertEqual(self.client.get(f'/api/questions/history/{session.id}/').status_code, 404)
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from questions.lexical import lexical_index, lexical_rank_ids
+from questions.models import Question
+from questions.ranking import ranking_index, reciprocal_rank_fusion
+from questions.tests.base import QuestionAPITestCase
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def test_rewards_ids_ranked_by_both(self):
+        self.assertEqual(reciprocal_rank_fusion([[1, 2, 3], [3, 2, 9]], 3), [3, 2, 1])
+        self.assertEqual(reciprocal_rank_fusion([[], []], 3), [])
+
+
+class LexicalRankingTests(QuestionAPITestCase):
+    def test_lexical_mode_ranks_by_keyword(self):
+        response = self.rank(query='emperor Rome', mode='lexical', limit=10)
+
+        self.assertEqual(response.data['mode'], 'lexical')
+        questions = Question.objects.in_bulk([question['id'] for question in response.data['results']])
+        self.assertEqual(len(questions), 10)
+        self.assertTrue(all('Rome' in question.question_text for question in questions.values()))
+
+    def test_hybrid_mode_fuses_both_rankings(self):
+        response = self.rank(mode='hybrid', limit=10)
+
+        self.assertEqual(response.data['mode'], 'hybrid')
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_keyword_search_does_not_build_the_embedding_matrix(self):
+        lexical_rank_ids('emperor', 5)
+
+        self.assertIsNone(ranking_index._snapshot)
+
+    def test_text_edits_reach_the_lexical_index(self):
+        question = Question.objects.first()
+        self.assertEqual(lexical_rank_ids('zebraword', 5), [])
+
+        question.question_text = 'zebraword'
+        question.save(update_fields=['question_text'])
+
+        self.assertEqual(lexical_rank_ids('zebraword', 5), [question.id])
+
+    def test_old_postings_are_served_while_another_request_rebuilds(self):
+        question = Question.objects.first()
+        lexical_rank_ids('zebraword', 5)
+        question.question_text = 'zebraword'
+        question.save(update_fields=['question_text'])
+
+        lexical_index._building = True
+        self.addCleanup(setattr, lexical_index, '_building', False)
+        self.assertEqual(lexical_rank_ids('zebraword', 5), [])
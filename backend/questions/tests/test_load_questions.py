@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from questions.embeddings import get_embedding_provider
+from questions.management.commands import load_questions
+from questions.models import Question
+from questions.tests.base import LOCAL_EMBEDDINGS
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    def test_items_may_span_chunks(self):
+        items = [{'question': f'Question {i}?', 'answer': 'x' * i} for i in range(20)]
+        with mock.patch.object(load_questions, 'CHUNK_SIZE', 7):
+            parsed = list(load_questions.iter_json_array(io.StringIO(json.dumps(items, indent=1))))
+
+        self.assertEqual(parsed, items)
+
+    def test_rejects_anything_but_an_array(self):
+        with self.assertRaises(ValueError):
+            list(load_questions.iter_json_array(io.StringIO('{"question": "?"}')))
+        with self.assertRaises(ValueError):
+            list(load_questions.iter_json_array(io.StringIO('[{"question": "?"}, {"quest')))
+
+
+@override_settings(EMBEDDINGS=LOCAL_EMBEDDINGS)
+class LoadQuestionsTests(TestCase):
+    def setUp(self):
+        get_embedding_provider.cache_clear()
+        self.addCleanup(get_embedding_provider.cache_clear)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'questions.jsonl')
+
+    def load(self, items, **options):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps(item) + '\n')
+        call_command('load_questions', path=self.path, batch_size=3, stdout=io.StringIO(), **options)
+
+    def items(self, count, answer='answer'):
+        return [{'question': f'Which moon is number {i}', 'answer': answer} for i in range(count)]
+
+    def test_embeds_items_without_a_vector(self):
+        self.load(self.items(7))
+
+        self.assertEqual(Question.objects.count(), 7)
+        self.assertEqual(len(Question.objects.first().vector), LOCAL_EMBEDDINGS['DIMENSIONS'])
+
+    def test_reloading_updates_rows_in_place(self):
+        self.load(self.items(7))
+        ids = list(Question.objects.values_list('id', flat=True))
+
+        self.load(self.items(7, answer='changed'))
+
+        self.assertEqual(list(Question.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(set(Question.objects.values_list('answer', flat=True)), {'changed'})
+
+    def test_prune_deletes_questions_missing_from_the_file_in_batches(self):
+        self.load(self.items(7))
+        kept = set(Question.objects.filter(question_text__in=[item['question'] for item in self.items(2)])
+                   .values_list('id', flat=True))
+
+        with mock.patch.object(load_questions, 'PRUNE_BATCH_SIZE', 2):
+            self.load(self.items(2), prune=True)
+
+        self.assertEqual(set(Question.objects.values_list('id', flat=True)), kept)
+
+    def test_without_prune_nothing_is_deleted(self):
+        self.load(self.items(7))
+        self.load(self.items(2))
+
+        self.assertEqual(Question.objects.count(), 7)
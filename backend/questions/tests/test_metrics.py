@@ -0,0 +1,57 @@
+import re
+
+from django.test import SimpleTestCase
+
+from questions.metrics import HISTOGRAMS, Histogram
+from questions.tests.base import QuestionAPITestCase
+
+
+class HistogramTests(SimpleTestCase):
+    def test_renders_cumulative_buckets(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(('home',), value)
+
+        self.assertEqual(histogram.render()[2:], [
+            'latency_seconds_bucket{view="home",le="0.1"} 1',
+            'latency_seconds_bucket{view="home",le="1"} 2',
+            'latency_seconds_bucket{view="home",le="+Inf"} 3',
+            'latency_seconds_sum{view="home"} 5.55',
+            'latency_seconds_count{view="home"} 3',
+        ])
+
+
+class MetricsMiddlewareTests(QuestionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+
+    def server_timing(self, response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+
+    def test_ranking_responses_time_each_phase(self):
+        response = self.rank(limit=5)
+
+        phases = self.server_timing(response)
+        for name in ('embedding', 'score', 'fetch', 'serialize', 'db', 'total'):
+            self.assertIn(name, phases)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+    def test_the_async_view_is_timed_too(self):
+        response = self.client.post('/api/questions/ranked/async/', {'query': 'planet star'}, format='json')
+
+        self.assertIn('score', self.server_timing(response))
+
+    def test_metrics_endpoint_exposes_requests_by_view(self):
+        self.rank(limit=5)
+        self.rank(limit=0)
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('question_ranker_request_duration_seconds_count{view="ranked-questions",status="200"} 1', body)
+        self.assertIn('question_ranker_request_duration_seconds_count{view="ranked-questions",status="400"} 1', body)
+        self.assertIn('question_ranker_phase_duration_seconds_count{view="ranked-questions",phase="score"} 1', body)
+        self.assertRegex(body, r'question_ranker_ranking_computed_total \d+')
@@ -0,0 +1,64 @@
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from questions import quantization
+from questions.embeddings import get_embedding_provider
+from questions.ranking import normalize, ranking_index
+from questions.tests.base import QuestionAPITestCase, make_question
+
+
+class CodesTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix = rng.standard_normal((500, 64)).astype(np.float32)
+        self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True)
+
+    def test_coarse_scan_keeps_the_true_nearest_neighbours(self):
+        query = self.matrix[7] + 0.1 * self.matrix[8]
+        exact = set(np.argsort(-(self.matrix @ query))[:10].tolist())
+        for mode in quantization.ENCODINGS:
+            with self.subTest(mode=mode):
+                codes = quantization.encode(self.matrix, mode)
+                coarse = set(np.argsort(-codes.score(query))[:100].tolist())
+                self.assertLess(codes.nbytes, self.matrix.nbytes)
+                self.assertIn(7, coarse)
+                self.assertGreaterEqual(len(exact & coarse), 5)
+
+    def test_row_updates_match_encoding_the_new_rows(self):
+        for mode in quantization.ENCODINGS:
+            with self.subTest(mode=mode):
+                codes = quantization.encode(self.matrix, mode, dims=32)
+                vector = self.matrix[0]
+                updated = codes.replaced(3, vector).appended(vector).deleted(1)
+                expected = np.delete(np.concatenate([codes.codes, codes.encode_rows(vector)]), 1, axis=0)
+                expected[2] = codes.encode_rows(vector)[0]
+                np.testing.assert_array_equal(updated.codes, expected)
+
+
+class QuantizedRankingTests(QuestionAPITestCase):
+    def setUp(self):
+        ranking = {**settings.RANKING, 'COMPRESSION': 'int8', 'RERANK_CANDIDATES': 20}
+        override = override_settings(RANKING=ranking)
+        override.enable()
+        self.addCleanup(override.disable)
+        super().setUp()
+
+    def test_candidates_are_re_ranked_with_exact_scores(self):
+        query = get_embedding_provider().embed_one('planet star')
+        ids, scores = ranking_index.search(query, 10)
+
+        snapshot = ranking_index.snapshot()
+        rows = [snapshot.positions[question_id] for question_id in ids.tolist()]
+        np.testing.assert_allclose(scores, snapshot.matrix[rows] @ normalize(query), rtol=1e-6)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+        exact = np.sort(snapshot.matrix @ normalize(query))[::-1][:10]
+        np.testing.assert_allclose(scores, exact, rtol=1e-5)
+
+    def test_new_questions_are_encoded_too(self):
+        ranking_index.snapshot()
+        question = make_question('Which nebula hides the quasar')
+
+        self.assertEqual(len(ranking_index.snapshot().codes.codes), len(ranking_index.snapshot().ids))
+        query = get_embedding_provider().embed_one('Which nebula hides the quasar')
+        self.assertEqual(ranking_index.search(query, 1)[0].tolist(), [question.id])
@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from questions.tests.base import QuestionAPITestCase
+
+
+class RankedQuestionsTests(QuestionAPITestCase):
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [question['id'] for question in response.data['results']]
+
+    def test_cursor_pages_through_one_ranking(self):
+        first = self.rank(limit=10)
+        cursor = first.data['cursor']
+        self.assertEqual(first.data['next_offset'], 10)
+
+        second = self.rank(limit=10, cursor=cursor, offset=10)
+        self.assertEqual(second.data['cursor'], cursor)
+        self.assertFalse(set(self.ids(first)) & set(self.ids(second)))
+        # A fresh ranking cut at the same offset is the same page
+        self.assertEqual(self.ids(self.rank(limit=10, offset=10)), self.ids(second))
+
+    def test_last_page_has_no_next_offset(self):
+        response = self.rank(limit=50, offset=50)
+
+        self.assertEqual(len(self.ids(response)), 10)
+        self.assertIsNone(response.data['next_offset'])
+
+    def test_unknown_cursor_starts_a_new_ranking(self):
+        response = self.rank(limit=5, cursor='expired', offset=0)
+
+        self.assertNotEqual(response.data['cursor'], 'expired')
+        self.assertEqual(len(self.ids(response)), 5)
+
+    def test_rejects_bad_limits_and_offsets(self):
+        depth = settings.RANKING_CURSOR_DEPTH
+        for data in ({'limit': True}, {'limit': 0}, {'limit': depth + 1}, {'offset': -1}, {'limit': 10, 'offset': depth}):
+            with self.subTest(**data):
+                self.assertEqual(self.rank(**data).status_code, 400)
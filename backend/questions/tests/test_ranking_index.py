@@ -0,0 +1,39 @@
+import numpy as np
+
+from questions.embeddings import get_embedding_provider
+from questions.models import Question
+from questions.ranking import normalize, ranking_index
+from questions.tests.base import QuestionAPITestCase, make_question
+
+
+class RankingIndexUpdateTests(QuestionAPITestCase):
+    def test_new_questions_are_appended_into_spare_rows(self):
+        before = ranking_index.snapshot()
+        first = make_question('Which nebula hides the quasar')
+        after_first = ranking_index.snapshot()
+        second = make_question('Which comet returns every year')
+        after_second = ranking_index.snapshot()
+
+        self.assertTrue(np.shares_memory(after_first.matrix, after_second.matrix))
+        self.assertEqual(len(before.ids), 60)
+        self.assertEqual(after_second.ids[-2:].tolist(), [first.id, second.id])
+        self.assertEqual(after_second.positions[second.id], 61)
+        self.assertNotIn(second.id, after_first.positions)
+        np.testing.assert_allclose(after_second.matrix[61], normalize(second.vector))
+
+    def test_edits_and_deletes_leave_older_snapshots_intact(self):
+        question = make_question('Which nebula hides the quasar')
+        snapshot = ranking_index.snapshot()
+        row = snapshot.positions[question.id]
+        vector = snapshot.matrix[row].copy()
+
+        question.set_embedding(get_embedding_provider().embed_one('Which comet returns every year'))
+        question.save()
+        Question.objects.filter(pk=Question.objects.first().pk).delete()
+        make_question('Which star is the brightest')
+
+        np.testing.assert_array_equal(snapshot.matrix[row], vector)
+        current = ranking_index.snapshot()
+        self.assertEqual(len(current.ids), 61)
+        self.assertEqual({int(i): row for row, i in enumerate(current.ids)}, current.positions)
+        np.testing.assert_allclose(current.matrix[current.positions[question.id]], normalize(question.vector))
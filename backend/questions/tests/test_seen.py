@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+
+from questions.models import Question
+from questions.seen import seen_questions
+from questions.tests.base import QuestionAPITestCase
+
+
+class ExcludeSeenTests(QuestionAPITestCase):
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [question['id'] for question in response.data['results']]
+
+    def test_excludes_questions_the_player_has_seen(self):
+        seen = self.ids(self.rank(limit=10))
+        self.submit(seen)
+
+        for mode in ('semantic', 'lexical', 'hybrid'):
+            with self.subTest(mode=mode):
+                fresh = self.ids(self.rank(limit=10, mode=mode, exclude_seen=True))
+                self.assertTrue(fresh)
+                self.assertFalse(set(seen) & set(fresh))
+
+        # Other players and requests without the flag are unaffected
+        self.assertEqual(self.ids(self.rank(limit=10)), seen)
+        other = self.client_for(User.objects.create_user('other'))
+        self.assertEqual(self.ids(self.rank(client=other, limit=10, exclude_seen=True)), seen)
+
+    def test_submit_updates_a_cached_seen_set(self):
+        ids = list(Question.objects.values_list('id', flat=True)[:3])
+        self.assertEqual(seen_questions.get(self.user.id).tolist(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(ids)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(seen_questions.get(self.user.id).tolist(), sorted(ids))
+
+    def test_rejects_a_non_boolean_flag(self):
+        self.assertEqual(self.rank(exclude_seen='sometimes').status_code, 400)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from questions import snapshots
+from questions.ranking import RankingIndex
+from questions.tests.base import LOCAL_EMBEDDINGS, make_question
+
+
+class SnapshotFileTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def write(self, rows):
+        return snapshots.write(self.directory, np.arange(rows, dtype=np.int64), np.ones((rows, 4), dtype=np.float32))
+
+    def test_written_version_loads_read_only(self):
+        manifest = self.write(3)
+
+        self.assertEqual(snapshots.read_manifest(self.directory), manifest)
+        ids, matrix = snapshots.load(self.directory, manifest)
+        self.assertEqual(list(ids), [0, 1, 2])
+        self.assertEqual(matrix.shape, (3, 4))
+        self.assertFalse(matrix.flags.writeable)
+
+    def test_concurrent_publishers_leave_one_valid_manifest(self):
+        threads = [threading.Thread(target=self.write, args=(rows,)) for rows in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        manifest = snapshots.read_manifest(self.directory)
+        ids, matrix = snapshots.load(self.directory, manifest)
+        self.assertEqual(len(ids), manifest['count'])
+        self.assertFalse([name for name in os.listdir(self.directory) if 'tmp' in name])
+        versions = [name for name in os.listdir(self.directory) if name[0].isdigit()]
+        self.assertEqual(len(versions), snapshots.KEEP_VERSIONS)
+
+    def test_initial_publish_keeps_an_existing_version(self):
+        manifest = self.write(2)
+
+        def read():
+            raise AssertionError('the database is not read when a version is live')
+
+        self.assertEqual(snapshots.publish(self.directory, read, initial=True), manifest)
+
+
+@override_settings(EMBEDDINGS=LOCAL_EMBEDDINGS)
+class SharedSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        ranking = {**settings.RANKING, 'SHARED_SNAPSHOT': True, 'SNAPSHOT_DIR': tmp.name, 'SNAPSHOT_POLL_INTERVAL': 0}
+        override = override_settings(RANKING=ranking)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.questions = [make_question(f'Which planet is number {i} from the star') for i in range(5)]
+
+    def test_workers_map_the_same_published_version(self):
+        first, second = RankingIndex(), RankingIndex()
+
+        self.assertEqual(list(first.snapshot().ids), list(second.snapshot().ids))
+        self.assertEqual(first._version, second._version)
+
+    def test_workers_swap_to_a_newer_publish(self):
+        first, second = RankingIndex(), RankingIndex()
+        second.snapshot()
+        question = make_question('Which emperor ruled Rome')
+
+        first.publish()
+
+        self.assertIn(question.id, list(second.snapshot().ids))
+        self.assertEqual(second._version, first._version)
@@ -0,0 +1,27 @@
+from questions.models import Question
+
+from .base import QuestionAPITestCase
+
+
+class SubmitAnswersTests(QuestionAPITestCase):
+    def test_grades_answers_with_typos(self):
+        question = Question.objects.get(question_text='Which planet is number 3 from the star')
+        response = self.submit([question.id], answer=' ANSWR 3 ')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['score'], 1)
+        self.assertTrue(response.data['answers'][0]['is_correct'])
+
+    def test_unknown_questions_are_skipped(self):
+        question = Question.objects.first()
+        response = self.submit([question.id, 999999, 'x'])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['answers']), 1)
+
+    def test_query_count_does_not_grow_with_the_answers(self):
+        ids = list(Question.objects.values_list('id', flat=True))
+        # Auth, load questions, then session, answers and counters in one transaction
+        for count in (2, 20):
+            with self.assertNumQueries(7):
+                self.assertEqual(self.submit(ids[:count]).status_code, 201)
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from .views import (
+    AsyncRankedQuestionsView,
     GameDetailView,
     GameHistoryView,
     RankedQuestionsView,
@@ -10,6 +11,7 @@ from .views import (
 
 urlpatterns = [
     path('ranked/', RankedQuestionsView.as_view(), name='ranked-questions'),
+    path('ranked/async/', AsyncRankedQuestionsView.as_view(), name='ranked-questions-async'),
     path('submit/', SubmitAnswersView.as_view(), name='submit-answers'),
     path('history/', GameHistoryView.as_view(), name='game-history'),
     path('history/<int:session_id>/', GameDetailView.as_view(), name='game-detail'),
@@ -1,94 +1,393 @@
-import numpy as np
-from dotenv import load_dotenv
-from openai import OpenAI
-from rest_framework import status
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .caching import normalize_query, query_embedding_cache, ranked_result_cache, ranking_cursors
+from .coalescing import ranking_flight
+from .counters import record_answers, record_open_report
+from .embeddings import EmbeddingError, get_embedding_provider
+from .fuzzy import grade_answers
+from .metrics import phase, render
+from .pagination import KeysetPagination
 from .models import Answer, GameSession, Question, QuestionReport
+from .lexical import lexical_index, lexical_rank_ids
+from .ranking import (
+    RANKING_MODES,
+    afetch_questions,
+    diversify,
+    fetch_questions,
+    rank_ids,
+    ranking_index,
+    reciprocal_rank_fusion,
+)
+from .seen import seen_questions
 from .serializers import (
+    AnswerSerializer,
     GameSessionListSerializer,
     GameSessionSerializer,
     QuestionReportSerializer,
     QuestionSerializer,
 )
 
-load_dotenv()
-client = OpenAI()
-
-
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-
-def levenshtein_distance(a: str, b: str) -> int:
-    """Calculate the Levenshtein distance between two strings."""
-    if len(a) < len(b):
-        return levenshtein_distance(b, a)
-
-    if len(b) == 0:
-        return len(a)
-
-    previous_row = range(len(b) + 1)
-    for i, c1 in enumerate(a):
-        current_row = [i + 1]
-        for j, c2 in enumerate(b):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    return previous_row[-1]
+logger = logging.getLogger(__name__)
+
+
+def _parse_limit(limit):
+    """Return ``(limit, error)``; ``error`` is a message unless ``limit`` is an integer from 1 to RANKING_CURSOR_DEPTH."""
+    if isinstance(limit, bool):
+        return None, 'limit must be an integer'
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None, 'limit must be an integer'
+    if limit < 1:
+        return None, 'limit must be positive'
+    if limit > settings.RANKING_CURSOR_DEPTH:
+        return None, f'limit must be at most {settings.RANKING_CURSOR_DEPTH}'
+    return limit, None
+
+
+def _parse_offset(offset, limit):
+    """Return ``(offset, error)``; the page must end within the RANKING_CURSOR_DEPTH ids a cursor holds."""
+    if isinstance(offset, bool):
+        return None, 'offset must be an integer'
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return None, 'offset must be an integer'
+    if offset < 0:
+        return None, 'offset must not be negative'
+    if offset + limit > settings.RANKING_CURSOR_DEPTH:
+        return None, f'offset + limit must be at most {settings.RANKING_CURSOR_DEPTH}'
+    return offset, None
+
+
+def _parse_mode(mode):
+    """Return ``(mode, error)``; a missing ``mode`` means the configured default."""
+    mode = mode or settings.RANKING['MODE']
+    if mode not in RANKING_MODES:
+        return None, f'mode must be one of: {", ".join(RANKING_MODES)}'
+    return mode, None
+
+
+def _parse_diversity(diversity):
+    """Return ``(diversity, error)``; ``error`` is a message unless ``diversity`` is a number from 0 to 1."""
+    try:
+        diversity = float(diversity)
+    except (TypeError, ValueError):
+        return None, 'diversity must be a number'
+    if not 0 <= diversity <= 1:
+        return None, 'diversity must be between 0 and 1'
+    return diversity, None
+
+
+def _parse_exclude_seen(exclude_seen):
+    """Return ``(exclude_seen, error)``; a missing value means ``RANKING['EXCLUDE_SEEN']``."""
+    if exclude_seen is None:
+        return settings.RANKING['EXCLUDE_SEEN'], None
+    if not isinstance(exclude_seen, bool):
+        return None, 'exclude_seen must be true or false'
+    return exclude_seen, None
+
+
+def _cursor_key(query, mode, diversity, user_id):
+    return (mode, diversity, user_id, normalize_query(query))
+
+
+def _rank(query, depth, mode, exclude=None):
+    """The top ``depth`` ids for ``query``; raises EmbeddingError unless ``mode`` is 'lexical'."""
+    if mode == 'lexical':
+        return lexical_rank_ids(query, depth, exclude)
+    provider = get_embedding_provider()
+    with phase('embedding'):
+        query_embedding = query_embedding_cache.get_or_compute(query, provider.model, provider.embed_one)
+    ids = rank_ids(query_embedding, depth, exclude)
+    if mode == 'hybrid':
+        ids = reciprocal_rank_fusion([ids, lexical_rank_ids(query, depth, exclude)], depth)
+    return ids
+
+
+# The async view keeps the ORM on the thread that owns the database
+# connection (thread_sensitive=True): polling the corpus version and any
+# index rebuild run there. Only the NumPy scoring, which touches no
+# database, runs in the thread pool so it does not hold up other requests.
+
+async def _alexical_rank_ids(query, depth, exclude=None):
+    postings = await sync_to_async(lexical_index.postings)()
+    with phase('lexical'):
+        ids, _ = await sync_to_async(postings.search, thread_sensitive=False)(query, depth, exclude)
+    return ids.tolist()
+
+
+async def _arank_ids(query_embedding, depth, exclude=None):
+    snapshot = await sync_to_async(ranking_index.snapshot)()
+    return await sync_to_async(rank_ids, thread_sensitive=False)(query_embedding, depth, exclude, snapshot)
+
+
+async def _arank(query, depth, mode, exclude=None):
+    if mode == 'lexical':
+        return await _alexical_rank_ids(query, depth, exclude)
+    provider = get_embedding_provider()
+    with phase('embedding'):
+        query_embedding = await query_embedding_cache.aget_or_compute(query, provider.model, provider.aembed_one)
+    ids = await _arank_ids(query_embedding, depth, exclude)
+    if mode == 'hybrid':
+        ids = reciprocal_rank_fusion([ids, await _alexical_rank_ids(query, depth, exclude)], depth)
+    return ids
+
+
+def _ranking_key(query, mode, depth, corpus_version):
+    model = None if mode == 'lexical' else get_embedding_provider().model
+    return ranked_result_cache.make_key(query, mode, model, depth, corpus_version)
+
+
+def _new_ranking(query, depth, mode, exclude=None):
+    """Rank ``query`` and return ``(ids, ranked_by)`` for the top ``depth`` questions not in ``exclude``.
+
+    If the embeddings backend fails, the ranking is lexical and ``ranked_by``
+    says so. Its cursor is still filed under the requested ``mode``, so the
+    rest of the game pages through the same ordering.
+    """
+    # A cached ranking for the current corpus needs no embedding or scan.
+    # Rankings that exclude a player's seen questions are theirs alone.
+    shared = exclude is None or not len(exclude)
+    key = _ranking_key(query, mode, depth, ranking_index.corpus_version()) if shared else None
+    ids = ranked_result_cache.get(key) if shared else None
+    ranked_by = mode
+    if ids is None:
+        try:
+            ids = _rank(query, depth, mode, exclude)
+        except EmbeddingError:
+            logger.warning('Embedding backend error, falling back to lexical ranking', exc_info=True)
+            ids = lexical_rank_ids(query, depth, exclude)
+            ranked_by = 'lexical'
+        else:
+            if shared:
+                ranked_result_cache.set(key, ids)
+    return ids, ranked_by
+
+
+async def _anew_ranking(query, depth, mode, exclude=None):
+    shared = exclude is None or not len(exclude)
+    ids = None
+    if shared:
+        corpus_version = await sync_to_async(ranking_index.corpus_version)()
+        key = _ranking_key(query, mode, depth, corpus_version)
+        ids = ranked_result_cache.get(key)
+    ranked_by = mode
+    if ids is None:
+        try:
+            ids = await _arank(query, depth, mode, exclude)
+        except EmbeddingError:
+            logger.warning('Embedding backend error, falling back to lexical ranking', exc_info=True)
+            ids = await _alexical_rank_ids(query, depth, exclude)
+            ranked_by = 'lexical'
+        else:
+            if shared:
+                ranked_result_cache.set(key, ids)
+    return ids, ranked_by
+
+
+def _window(ids, limit, offset):
+    """The ids of one page, and the offset of the next one (None after the last)."""
+    end = offset + limit
+    return ids[offset:end].tolist(), end if end < len(ids) else None
+
+
+def _ranked_page(cursor, next_offset, questions):
+    with phase('serialize'):
+        return {
+            'cursor': cursor.token,
+            'mode': cursor.ranked_by,
+            'next_offset': next_offset,
+            'results': QuestionSerializer(questions, many=True).data,
+        }
+
+
+def _diversify(cursor, end, diversity, snapshot=None):
+    """MMR re-rank the cursor's ids up to ``end``, continuing after the pages already served."""
+    if not diversity or cursor.diversified >= end:
+        return
+    with phase('diversity'):
+        cursor.ids = diversify(
+            cursor.ids, cursor.diversified, end, diversity, settings.RANKING['DIVERSITY_POOL'], snapshot
+        )
+    cursor.diversified = end
+
+
+def _ranked_questions(query, limit, cursor, offset, mode, diversity, user_id=None):
+    """One page of the ranking for ``query``; with a ``user_id``, without the questions they answered before."""
+    key = _cursor_key(query, mode, diversity, user_id)
+    cursor = ranking_cursors.get(cursor, key) if isinstance(cursor, str) else None
+    if cursor is None:
+        # No cursor, or it expired or was made by another worker: rank afresh.
+        # Identical concurrent requests share one embedding call and scan.
+        depth = settings.RANKING_CURSOR_DEPTH
+        exclude = None
+        if user_id is not None:
+            with phase('seen'):
+                exclude = seen_questions.get(user_id)
+        ids, ranked_by = ranking_flight.do(
+            (normalize_query(query), depth, mode, user_id), lambda: _new_ranking(query, depth, mode, exclude)
+        )
+        cursor = ranking_cursors.create(key, ids, ranked_by)
+    _diversify(cursor, offset + limit, diversity)
+    window, next_offset = _window(cursor.ids, limit, offset)
+    with phase('fetch'):
+        questions = fetch_questions(window)
+    return _ranked_page(cursor, next_offset, questions)
+
+
+async def _aranked_questions(query, limit, cursor, offset, mode, diversity, user_id=None):
+    key = _cursor_key(query, mode, diversity, user_id)
+    cursor = ranking_cursors.get(cursor, key) if isinstance(cursor, str) else None
+    if cursor is None:
+        depth = settings.RANKING_CURSOR_DEPTH
+        exclude = None
+        if user_id is not None:
+            with phase('seen'):
+                exclude = await sync_to_async(seen_questions.get)(user_id)
+        ids, ranked_by = await ranking_flight.ado(
+            (normalize_query(query), depth, mode, user_id), lambda: _anew_ranking(query, depth, mode, exclude)
+        )
+        cursor = ranking_cursors.create(key, ids, ranked_by)
+    if diversity and cursor.diversified < offset + limit:
+        snapshot = await sync_to_async(ranking_index.snapshot)()
+        await sync_to_async(_diversify, thread_sensitive=False)(cursor, offset + limit, diversity, snapshot)
+    window, next_offset = _window(cursor.ids, limit, offset)
+    with phase('fetch'):
+        questions = await afetch_questions(window)
+    return _ranked_page(cursor, next_offset, questions)
 
 
-def is_answer_correct(user_answer: str, correct_answer: str, max_distance: int = 2) -> bool:
-    """Check if answer is correct, allowing for minor typos."""
-    normalized_user = user_answer.strip().lower()
-    normalized_correct = correct_answer.strip().lower()
+class RankedQuestionsView(APIView):
+    """The ``limit`` questions closest to ``query``, starting at ``offset``.
 
-    if normalized_user == normalized_correct:
-        return True
+    ``mode`` picks semantic (embeddings), lexical (BM25 keywords) or hybrid
+    ranking, defaulting to ``RANKING['MODE']``. If the embeddings backend
+    fails the ranking is lexical instead, and the response ``mode`` says so.
 
-    if len(normalized_user) == 0:
-        return False
+    The response carries a ``cursor`` for the ranking it was cut from. Send
+    it back with ``next_offset`` to get the following questions for the same
+    query without ranking again. A cursor that expired, or was issued for
+    another query or mode, is silently replaced by a new one.
 
-    return levenshtein_distance(normalized_user, normalized_correct) <= max_distance
+    ``diversity`` (0 to 1, default 0) re-ranks each page by maximal marginal
+    relevance, trading relevance for questions that are less alike.
 
+    ``exclude_seen`` (default ``RANKING['EXCLUDE_SEEN']``) leaves out the
+    questions the player has answered in earlier games.
+    """
 
-class RankedQuestionsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         query = request.data.get('query', '')
         limit = request.data.get('limit', 20)
+        cursor = request.data.get('cursor')
+        offset = request.data.get('offset', 0)
+        mode = request.data.get('mode')
+        diversity = request.data.get('diversity') or 0
+        exclude_seen = request.data.get('exclude_seen')
 
         if not query:
             return Response({'error': 'Query is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        limit, error = _parse_limit(limit)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        offset, error = _parse_offset(offset, limit)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        mode, error = _parse_mode(mode)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        diversity, error = _parse_diversity(diversity)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        exclude_seen, error = _parse_exclude_seen(exclude_seen)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.user.id if exclude_seen else None
+        return Response(_ranked_questions(query, limit, cursor, offset, mode, diversity, user_id))
+
+
+class AsyncRankedQuestionsView(View):
+    """``RankedQuestionsView`` for ASGI servers.
+
+    DRF views are synchronous, so this is a plain async Django view: the
+    embeddings round-trip is awaited instead of blocking a worker, scoring
+    runs in a thread and the questions are fetched with the async ORM.
+    """
+
+    authentication = JWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Authenticated by bearer token, not cookies, like every APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
         try:
-            response = client.embeddings.create(
-                input=query,
-                model="text-embedding-3-small"
+            credentials = await sync_to_async(self.authentication.authenticate)(request)
+        except exceptions.AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        if credentials is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED
             )
-            query_embedding = response.data[0].embedding
-
-            questions = Question.objects.all()
-            scored_questions = []
-
-            for question in questions:
-                similarity = cosine_similarity(query_embedding, question.embedding)
-                scored_questions.append((question, similarity))
 
-            scored_questions.sort(key=lambda x: x[1], reverse=True)
-            top_questions = [q[0] for q in scored_questions[:limit]]
-
-            serializer = QuestionSerializer(top_questions, many=True)
-            return Response(serializer.data)
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+
+        query = data.get('query', '')
+        limit = data.get('limit', 20)
+        cursor = data.get('cursor')
+        offset = data.get('offset', 0)
+        mode = data.get('mode')
+        diversity = data.get('diversity') or 0
+        exclude_seen = data.get('exclude_seen')
 
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if not query:
+            return JsonResponse({'error': 'Query is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit, error = _parse_limit(limit)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        offset, error = _parse_offset(offset, limit)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        mode, error = _parse_mode(mode)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        diversity, error = _parse_diversity(diversity)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        exclude_seen, error = _parse_exclude_seen(exclude_seen)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = credentials[0].id if exclude_seen else None
+        return JsonResponse(await _aranked_questions(query, limit, cursor, offset, mode, diversity, user_id))
 
 
 class SubmitAnswersView(APIView):
@@ -101,47 +400,66 @@ class SubmitAnswersView(APIView):
         if not query or not answers:
             return Response({'error': 'Query and answers are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        session = GameSession.objects.create(
-            user=request.user,
-            query=query,
-            total_questions=len(answers)
-        )
-
-        score = 0
+        question_ids = set()
         for answer_data in answers:
-            question_id = answer_data.get('question_id')
-            user_answer = answer_data.get('answer', '')
+            try:
+                question_ids.add(int(answer_data.get('question_id')))
+            except (TypeError, ValueError):
+                continue
+
+        # One query for every answered question; question_text is loaded too
+        # because the response includes it.
+        with phase('load'):
+            questions = Question.objects.only('id', 'question_text', 'answer').in_bulk(question_ids)
 
+        session = GameSession(user=request.user, query=query, total_questions=len(answers))
+        answered = []
+        for answer_data in answers:
             try:
-                question = Question.objects.get(id=question_id)
-                correct = is_answer_correct(user_answer, question.answer)
-                if correct:
-                    score += 1
-
-                Answer.objects.create(
-                    session=session,
-                    question=question,
-                    user_answer=user_answer.strip().lower(),
-                    is_correct=correct
-                )
-            except Question.DoesNotExist:
+                question = questions.get(int(answer_data.get('question_id')))
+            except (TypeError, ValueError):
                 continue
+            if question is not None:
+                answered.append((question, answer_data.get('answer', '')))
+
+        with phase('grade'):
+            grades = grade_answers((user_answer, question.answer) for question, user_answer in answered)
+        answer_objects = [
+            Answer(
+                session=session,
+                question=question,
+                user_answer=user_answer.strip().lower(),
+                is_correct=correct
+            )
+            for (question, user_answer), correct in zip(answered, grades)
+        ]
+        session.score = sum(grades)
 
-        session.score = score
-        session.save()
+        with phase('write'), transaction.atomic():
+            session.save()
+            Answer.objects.bulk_create(answer_objects)
+            record_answers(answer_objects)
+            # Later rankings for this player skip these questions without reloading their history
+            user_id = request.user.id
+            answered_ids = [answer.question_id for answer in answer_objects]
+            transaction.on_commit(lambda: seen_questions.add(user_id, answered_ids))
 
-        serializer = GameSessionSerializer(session)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        with phase('serialize'):
+            data = GameSessionListSerializer(session).data
+            data['answers'] = AnswerSerializer(answer_objects, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class GameHistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get(self, request):
-        """Get user's game history."""
-        sessions = GameSession.objects.filter(user=request.user)[:20]
+        """Get user's game history, newest first, one page at a time."""
+        paginator = self.pagination_class()
+        sessions = paginator.paginate_queryset(GameSession.objects.filter(user=request.user), request, view=self)
         serializer = GameSessionListSerializer(sessions, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class GameDetailView(APIView):
@@ -149,8 +467,20 @@ class GameDetailView(APIView):
 
     def get(self, request, session_id):
         """Get details of a specific game session."""
+        # Answers and the two Question columns they show, in one extra query
+        answers = (
+            Answer.objects
+            .select_related('question')
+            .only(
+                'id', 'session_id', 'user_answer', 'is_correct', 'answered_at',
+                'question__id', 'question__question_text', 'question__answer',
+            )
+            .order_by('id')
+        )
         try:
-            session = GameSession.objects.get(id=session_id, user=request.user)
+            session = GameSession.objects.prefetch_related(Prefetch('answers', queryset=answers)).get(
+                id=session_id, user=request.user
+            )
             serializer = GameSessionSerializer(session)
             return Response(serializer.data)
         except GameSession.DoesNotExist:
@@ -197,12 +527,37 @@ class ReportQuestionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        report = QuestionReport.objects.create(
-            user=request.user,
-            question=question,
-            report_type=report_type,
-            description=description
-        )
+        with transaction.atomic():
+            report = QuestionReport.objects.create(
+                user=request.user,
+                question=question,
+                report_type=report_type,
+                description=description
+            )
+            record_open_report(question.id)
 
         serializer = QuestionReportSerializer(report)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def metrics_view(request):
+    """Latency histograms and cache/coalescing counters of this process, for Prometheus."""
+    lines = []
+    counters = {
+        'question_ranker_ranking_computed_total': ranking_flight.executed,
+        'question_ranker_ranking_coalesced_total': ranking_flight.coalesced,
+        'question_ranker_ranking_coalesce_timeouts_total': ranking_flight.timeouts,
+        'question_ranker_ranked_result_cache_hits_total': ranked_result_cache.memory.hits,
+        'question_ranker_ranked_result_cache_misses_total': ranked_result_cache.memory.misses,
+        'question_ranker_ranking_cursor_hits_total': ranking_cursors.hits,
+        'question_ranker_ranking_cursor_misses_total': ranking_cursors.misses,
+        'question_ranker_ranking_cursor_evictions_total': ranking_cursors.evicted,
+        'question_ranker_seen_questions_hits_total': seen_questions.hits,
+        'question_ranker_seen_questions_loads_total': seen_questions.loads,
+        'question_ranker_query_embedding_memory_hits_total': query_embedding_cache.memory.hits,
+        'question_ranker_query_embedding_persistent_hits_total': query_embedding_cache.persistent_hits,
+        'question_ranker_query_embedding_misses_total': query_embedding_cache.misses,
+    }
+    for name, value in counters.items():
+        lines += [f'# TYPE {name} counter', f'{name} {value}']
+    return HttpResponse(render(lines), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,47 +1,165 @@
-from openai import OpenAI
 from dotenv import load_dotenv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import argparse
 import csv
 import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from questions.embeddings import get_embedding_provider, text_hash  # noqa: E402
 
 load_dotenv()
 
-client = OpenAI()
 
-def calculate_embeddings():
-    questions = []
+def load_checkpoint(output_path):
+    """Return the hashes already embedded in ``output_path``.
+
+    A crash can leave a partially written last line; it is truncated so the
+    file stays valid JSON Lines and the row is embedded again.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    valid_bytes = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            done.add(record['hash'])
+            valid_bytes += len(line)
+
+    if valid_bytes < os.path.getsize(output_path):
+        with open(output_path, 'rb+') as f:
+            f.truncate(valid_bytes)
+    return done
 
-    # Load questions from CSV
-    with open('questions.csv', 'r', encoding='utf-8') as file:
+
+def iter_batches(csv_path, done, batch_size):
+    """Yield batches of CSV rows whose question text has no embedding yet."""
+    batch = []
+    with open(csv_path, 'r', encoding='utf-8') as file:
         reader = csv.DictReader(file, delimiter=';')
         for row in reader:
-            questions.append({
-                'question': row['questions'],
-                'answer': row['answer']
-            })
+            digest = text_hash(row['questions'])
+            if digest in done:
+                continue
+            done.add(digest)
+            batch.append({'hash': digest, 'question': row['questions'], 'answer': row['answer']})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def embed_batch(provider, batch):
+    vectors = provider.embed([item['question'] for item in batch])
+    for item, vector in zip(batch, vectors):
+        item['embedding'] = vector.tolist()
+    return batch
+
+
+def export_json(jsonl_path, json_path):
+    """Stream the JSON Lines checkpoint into the JSON array format, one record at a time."""
+    with open(jsonl_path, 'r', encoding='utf-8') as src, open(json_path, 'w', encoding='utf-8') as dst:
+        dst.write('[')
+        for i, line in enumerate(src):
+            if i:
+                dst.write(',\n')
+            dst.write(line.rstrip('\n'))
+        dst.write(']\n')
+
+
+def calculate_embeddings(csv_path='questions.csv', output_path='questions_embeddings.jsonl',
+                         export_path='questions_embeddings.json', batch_size=100, workers=4,
+                         checkpoint_every=10):
+    provider = get_embedding_provider()
+    done = load_checkpoint(output_path)
+    if done:
+        print(f"Resuming: {len(done)} questions already embedded in {output_path}")
+
+    print(f"Calculating embeddings with {provider.model} "
+          f"(batches of {batch_size}, {workers} in flight)...")
+
+    written = 0
+    batches_since_sync = 0
+    started = time.perf_counter()
+    batches = iter_batches(csv_path, done, batch_size)
+
+    with open(output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit_next():
+            batch = next(batches, None)
+            if batch is None:
+                return None
+            return pool.submit(embed_batch, provider, batch)
+
+        # Keep at most ``workers`` batches in flight so memory stays bounded
+        # no matter how large the CSV is.
+        in_flight = set()
+        for _ in range(workers):
+            future = submit_next()
+            if future is not None:
+                in_flight.add(future)
+
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = future.result()
+                for item in batch:
+                    out.write(json.dumps(item) + '\n')
+                written += len(batch)
+                batches_since_sync += 1
+
+                if batches_since_sync >= checkpoint_every:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    batches_since_sync = 0
+                    rate = written / (time.perf_counter() - started)
+                    print(f"Checkpoint: {written} new embeddings ({rate:.0f} rows/s)")
+
+                future = submit_next()
+                if future is not None:
+                    in_flight.add(future)
+
+        out.flush()
+        os.fsync(out.fileno())
 
-    print(f"Calculating embeddings for {len(questions)} questions...")
+    elapsed = time.perf_counter() - started
+    print(f"✓ {written} new embeddings appended to {output_path} in {elapsed:.1f}s")
 
-    # Calculate embeddings for all questions
-    questions_with_embeddings = []
-    for i, q in enumerate(questions):
-        print(f"Processing {i+1}/{len(questions)}: {q['question'][:50]}...")
+    if export_path:
+        export_json(output_path, export_path)
+        print(f"✓ Embeddings exported to {export_path}")
 
-        response = client.embeddings.create(
-            input=q['question'],
-            model="text-embedding-3-small"
-        )
 
-        questions_with_embeddings.append({
-            'question': q['question'],
-            'answer': q['answer'],
-            'embedding': response.data[0].embedding
-        })
+def main():
+    parser = argparse.ArgumentParser(description='Calculate question embeddings from a CSV file.')
+    parser.add_argument('--input', default='questions.csv', help='Semicolon-separated CSV with questions;answer columns')
+    parser.add_argument('--output', default='questions_embeddings.jsonl', help='Append-only JSON Lines checkpoint file')
+    parser.add_argument('--export', default='questions_embeddings.json',
+                        help="JSON array file written at the end ('' to skip)")
+    parser.add_argument('--batch-size', type=int, default=100, help='Questions per embeddings request')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent in-flight requests')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='Batches between fsync checkpoints')
+    args = parser.parse_args()
 
-    # Save to JSON file
-    with open('questions_embeddings.json', 'w', encoding='utf-8') as f:
-        json.dump(questions_with_embeddings, f)
+    calculate_embeddings(
+        csv_path=args.input,
+        output_path=args.output,
+        export_path=args.export,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every,
+    )
 
-    print(f"✓ Embeddings saved to questions_embeddings.json")
 
 if __name__ == '__main__':
-    calculate_embeddings()
+    main()
@@ -24,10 +24,18 @@ import type { Answer, GameResult, Question } from './types';
 
 type GameState = 'input' | 'playing' | 'results';
 
+interface RankingCursor {
+  query: string;
+  cursor: string;
+  nextOffset: number;
+}
+
 const INITIAL_TIME = 30;
 const TIME_BONUS = 5;
 const MAX_TIME = 60;
 const QUESTIONS_PER_GAME = 20;
+// With "Mix up similar questions" on, keeps near-paraphrases of one question from filling a game
+const QUESTION_DIVERSITY = 0.3;
 
 const PRESET_CATEGORIES = [
   // Science & Nature
@@ -61,6 +69,9 @@ export default function Game() {
   const [reportOpen, setReportOpen] = useState(false);
   const [questionToReport, setQuestionToReport] = useState<Question | null>(null);
   const [shuffleEnabled, setShuffleEnabled] = useState(true);
+  const [excludeSeen, setExcludeSeen] = useState(false);
+  const [diversifyEnabled, setDiversifyEnabled] = useState(false);
+  const [rankingCursor, setRankingCursor] = useState<RankingCursor | null>(null);
   const inputRef = useRef<HTMLInputElement>(null);
 
   const shuffleArray = <T,>(array: T[]): T[] => {
@@ -116,7 +127,23 @@ export default function Game() {
     setError('');
 
     try {
-      const rankedQuestions = await getRankedQuestions(gameQuery, token, QUESTIONS_PER_GAME);
+      // Replaying a topic continues its ranking instead of repeating the same questions
+      const previous = rankingCursor?.query === gameQuery ? rankingCursor : null;
+      const page = await getRankedQuestions(
+        gameQuery,
+        token,
+        QUESTIONS_PER_GAME,
+        previous?.cursor,
+        previous?.nextOffset ?? 0,
+        diversifyEnabled ? QUESTION_DIVERSITY : 0,
+        excludeSeen || undefined
+      );
+      setRankingCursor(
+        page.next_offset === null
+          ? null
+          : { query: gameQuery, cursor: page.cursor, nextOffset: page.next_offset }
+      );
+      const rankedQuestions = page.results;
       const finalQuestions = shuffleEnabled ? shuffleArray(rankedQuestions) : rankedQuestions;
       setQuestions(finalQuestions);
       setCurrentQuestionIndex(0);
@@ -294,6 +321,34 @@ export default function Game() {
                   </Label>
                 </div>
 
+                <div className="flex items-center space-x-2">
+                  <Checkbox
+                    id="exclude-seen"
+                    checked={excludeSeen}
+                    onCheckedChange={(checked) => setExcludeSeen(checked === true)}
+                  />
+                  <Label
+                    htmlFor="exclude-seen"
+                    className="text-sm font-medium leading-none peer-disabled:cursor-not-allowed peer-disabled:opacity-70 cursor-pointer"
+                  >
+                    Skip questions I have already answered
+                  </Label>
+                </div>
+
+                <div className="flex items-center space-x-2">
+                  <Checkbox
+                    id="diversify"
+                    checked={diversifyEnabled}
+                    onCheckedChange={(checked) => setDiversifyEnabled(checked === true)}
+                  />
+                  <Label
+                    htmlFor="diversify"
+                    className="text-sm font-medium leading-none peer-disabled:cursor-not-allowed peer-disabled:opacity-70 cursor-pointer"
+                  >
+                    Mix up similar questions
+                  </Label>
+                </div>
+
                 <div className="relative">
                   <div className="absolute inset-0 flex items-center">
                     <span className="w-full border-t" />
@@ -487,6 +542,16 @@ export default function Game() {
                 <Button onClick={resetGame} size="lg" className="px-12">
                   Play Again
                 </Button>
+                {rankingCursor?.query === result.query && (
+                  <Button
+                    variant="outline"
+                    size="lg"
+                    disabled={loading}
+                    onClick={() => startGame(result.query)}
+                  >
+                    More on this Topic
+                  </Button>
+                )}
                 <Button
                   variant="outline"
                   size="lg"
@@ -1,4 +1,12 @@
-import type { Answer, AuthResponse, GameResult, Question, QuestionReport, ReportType } from './types';
+import type {
+  Answer,
+  AuthResponse,
+  GameHistoryPage,
+  GameResult,
+  QuestionReport,
+  RankedQuestionsPage,
+  ReportType,
+} from './types';
 
 const API_URL = 'http://localhost:8000/api';
 
@@ -32,18 +40,26 @@ export const login = async (username: string, password: string): Promise<AuthRes
   return response.json();
 };
 
+// Pass a previous page's cursor and next_offset to continue the same ranking.
+// diversity (0 to 1) trades relevance for questions that are less alike.
+// excludeSeen leaves out questions the player answered in earlier games;
+// when omitted the server default (RANKING_EXCLUDE_SEEN) applies.
 export const getRankedQuestions = async (
   query: string,
   token: string,
-  limit: number = 10
-): Promise<Question[]> => {
+  limit: number = 10,
+  cursor?: string,
+  offset: number = 0,
+  diversity: number = 0,
+  excludeSeen?: boolean
+): Promise<RankedQuestionsPage> => {
   const response = await fetch(`${API_URL}/questions/ranked/`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
       Authorization: `Bearer ${token}`,
     },
-    body: JSON.stringify({ query, limit }),
+    body: JSON.stringify({ query, limit, cursor, offset, diversity, exclude_seen: excludeSeen }),
   });
 
   if (!response.ok) {
@@ -76,8 +92,9 @@ export const submitAnswers = async (
   return response.json();
 };
 
-export const getGameHistory = async (token: string): Promise<GameResult[]> => {
-  const response = await fetch(`${API_URL}/questions/history/`, {
+// Pass the previous page's `next` URL to fetch the following page.
+export const getGameHistory = async (token: string, pageUrl?: string): Promise<GameHistoryPage> => {
+  const response = await fetch(pageUrl ?? `${API_URL}/questions/history/`, {
     method: 'GET',
     headers: {
       Authorization: `Bearer ${token}`,
@@ -27,6 +27,8 @@ interface GameHistoryProps {
 
 export default function GameHistory({ token, open, onOpenChange }: GameHistoryProps) {
   const [games, setGames] = useState<GameResult[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedGame, setSelectedGame] = useState<GameResult | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -43,7 +45,8 @@ export default function GameHistory({ token, open, onOpenChange }: GameHistoryPr
 
     try {
       const history = await getGameHistory(token);
-      setGames(history);
+      setGames(history.results);
+      setNextPage(history.next);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load history');
     } finally {
@@ -51,6 +54,20 @@ export default function GameHistory({ token, open, onOpenChange }: GameHistoryPr
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setLoadingMore(true);
+    try {
+      const history = await getGameHistory(token, nextPage);
+      setGames((previous) => [...previous, ...history.results]);
+      setNextPage(history.next);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load history');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const viewGameDetail = async (gameId: number) => {
     setLoading(true);
     try {
@@ -136,6 +153,16 @@ export default function GameHistory({ token, open, onOpenChange }: GameHistoryPr
                   </CardContent>
                 </Card>
               ))}
+              {nextPage && (
+                <Button
+                  variant="outline"
+                  className="w-full"
+                  disabled={loadingMore}
+                  onClick={loadMore}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              )}
             </div>
           )}
 
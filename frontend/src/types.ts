@@ -15,6 +15,15 @@ export interface Question {
   answer: string;
 }
 
+export type RankingMode = 'semantic' | 'lexical' | 'hybrid';
+
+export interface RankedQuestionsPage {
+  results: Question[];
+  cursor: string;
+  mode: RankingMode;
+  next_offset: number | null;
+}
+
 export interface Answer {
   question_id: number;
   answer: string;
@@ -39,6 +48,11 @@ export interface GameResult {
   answers?: GameAnswer[];
 }
 
+export interface GameHistoryPage {
+  results: GameResult[];
+  next: string | null;
+}
+
 export type ReportType = 'wrong_answer' | 'repeated' | 'unclear' | 'inappropriate' | 'other';
 
 export interface QuestionReport {
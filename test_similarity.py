@@ -1,12 +1,15 @@
-from openai import OpenAI
 from numpy import dot
 from numpy.linalg import norm
 from dotenv import load_dotenv
 import json
+import os
+import sys
 
-load_dotenv()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from questions.embeddings import get_embedding_provider  # noqa: E402
 
-client = OpenAI()
+load_dotenv()
 
 def cosine_similarity(a, b):
     return dot(a, b) / (norm(a) * norm(b))
@@ -28,11 +31,7 @@ def find_similar_questions(query, top_n=10):
 
     # Calculate embedding for the query
     print(f"\nCalculating embedding for: '{query}'")
-    response = client.embeddings.create(
-        input=query,
-        model="text-embedding-3-small"
-    )
-    query_embedding = response.data[0].embedding
+    query_embedding = get_embedding_provider().embed_one(query)
 
     # Calculate similarity for each question
     questions_with_similarity = []